@@ -15,10 +15,13 @@ Versão: 1.0.0
 """
 
 from core.context_metrics import (
+    TokenProfile,
+    OnlineContextMetrics,
     calculate_sd,
     context_density,
     contextual_pressure,
-    classify_context_regime
+    classify_context_regime,
+    set_metrics_mode,
 )
 
 from core.context_model import (
@@ -29,10 +32,13 @@ from core.context_model import (
 
 __all__ = [
     # Métricas
+    "TokenProfile",
+    "OnlineContextMetrics",
     "calculate_sd",
     "context_density",
     "contextual_pressure",
     "classify_context_regime",
+    "set_metrics_mode",
     
     # Estruturas
     "ContextComponent",
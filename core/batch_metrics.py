@@ -0,0 +1,122 @@
+"""
+core/batch_metrics.py
+────────────────────────────────────────────
+Métricas vetorizadas para grandes volumes de texto (corpora, logs).
+
+Calcula SD, S_H, μ e contagem de tokens para uma lista de textos de
+uma só vez: os tokens de cada lote são mapeados para ids inteiros e
+as reduções (vocabulário único, entropia) são feitas com NumPy sobre
+um array plano de ids + offsets por texto.
+
+Tolerância:
+    Os valores coincidem com calculate_sd, semantic_entropy e
+    lexical_coherence (arredondados a 4 casas) com diferença absoluta
+    ≤ 1e-4 — a única divergência possível vem da ordem de soma em
+    ponto flutuante e do arredondamento de np.round em casos de empate.
+
+Requisitos:
+    pip install numpy
+────────────────────────────────────────────
+Autor: Context Engineering Lab
+Licença: MIT
+Versão: 1.0.0
+"""
+
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from core.context_metrics import tokenize
+
+
+BATCH_TOLERANCE = 1e-4
+
+
+# ============================================================
+# 🔹 FUNÇÃO: métricas em lote
+# ============================================================
+
+def batch_metrics(texts: Iterable[str], batch_size: int = 10_000) -> Dict[str, np.ndarray]:
+    """
+    Calcula as métricas escalares do CEF para vários textos de uma vez.
+
+    Args:
+        texts: Textos a pontuar (entradas não textuais valem 0.0).
+        batch_size: Textos processados por lote (limita a memória do
+            array plano de ids).
+
+    Returns:
+        Dict com arrays alinhados a `texts`:
+          sd, entropy, mu (float64) e token_count (int64).
+    """
+    parts: List[Dict[str, np.ndarray]] = []
+    batch: List[str] = []
+
+    for text in texts:
+        batch.append(text)
+        if len(batch) >= batch_size:
+            parts.append(_score_batch(batch))
+            batch = []
+    if batch or not parts:
+        parts.append(_score_batch(batch))
+
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+
+def _score_batch(texts: List[str]) -> Dict[str, np.ndarray]:
+    """Pontua um lote: ids planos + offsets → reduções segmentadas."""
+    vocab: Dict[str, int] = {}
+    ids: List[int] = []
+    lengths: List[int] = []
+
+    for text in texts:
+        tokens = tokenize(text) if text and isinstance(text, str) else []
+        ids.extend(vocab.setdefault(t, len(vocab)) for t in tokens)
+        lengths.append(len(tokens))
+
+    n_docs = len(texts)
+    n = np.asarray(lengths, dtype=np.int64)
+    flat = np.asarray(ids, dtype=np.int64)
+
+    # Pares (texto, token) únicos e suas frequências
+    doc_of = np.repeat(np.arange(n_docs, dtype=np.int64), n)
+    keys = doc_of * max(len(vocab), 1) + flat
+    pair_keys, pair_counts = np.unique(keys, return_counts=True)
+    pair_doc = pair_keys // max(len(vocab), 1)
+
+    unique = np.bincount(pair_doc, minlength=n_docs)
+
+    # Entropia de Shannon por texto (bits)
+    p = pair_counts / n[pair_doc]
+    entropy_bits = np.bincount(pair_doc, weights=-p * np.log2(p), minlength=n_docs)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(n > 0, unique / n, 0.0)
+        sd = np.minimum(1.0, ratio * (1 - np.exp(-n / 50)))
+        sh = np.where(n > 1, entropy_bits / np.log2(np.maximum(n, 2)), 0.0)
+
+    sd = np.round(sd, 4)
+    sh = np.round(sh, 4)
+    mu = np.round((1 - sh) * sd, 4)
+
+    return {"sd": sd, "entropy": sh, "mu": mu, "token_count": n}
+
+
+# ============================================================
+# 🔹 TESTE RÁPIDO
+# ============================================================
+
+if __name__ == "__main__":
+    from core.context_metrics import calculate_sd, semantic_entropy, lexical_coherence
+
+    corpus = [
+        "Agente analítico especializado em síntese cognitiva e compressão semântica.",
+        "Explique a diferença entre contexto simbólico e contexto lógico.",
+        "",
+        "contexto contexto contexto",
+    ]
+    result = batch_metrics(corpus)
+    for i, text in enumerate(corpus):
+        print(f"SD={result['sd'][i]} (escalar {calculate_sd(text)}) | "
+              f"S_H={result['entropy'][i]} (escalar {semantic_entropy(text)}) | "
+              f"μ={result['mu'][i]} (escalar {lexical_coherence(text)})")
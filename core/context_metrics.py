@@ -8,6 +8,9 @@ Fornece funções para medir:
 - Pressão Contextual (PC)
 - Entropia Semântica (S_H)
 - Coerência Lexical (μ)
+
+Todas as métricas aceitam texto puro ou um TokenProfile já
+calculado, evitando re-tokenizar o mesmo texto várias vezes.
 ────────────────────────────────────────────
 Autor: Context Engineering Lab
 Licença: MIT
@@ -16,15 +19,151 @@ Versão: 1.0.0
 
 import math
 import re
-from collections import Counter
-from typing import Dict, List
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from core.metrics_cache import CacheInfo, MetricsCache, content_hash
+
+
+_TOKEN_RE = re.compile(r"\b\w+\b")
+
+# Modo global de perfis: "exact" (Counter) ou "approximate" (sketches)
+_METRICS_MODE = "exact"
+
+# Cache opcional de (SD, S_H, μ) por hash de conteúdo
+_METRICS_CACHE: Optional[MetricsCache] = None
+
+
+# ============================================================
+# 🔹 TOKENIZAÇÃO E PERFIL DE TOKENS
+# ============================================================
+
+def tokenize(text: str) -> List[str]:
+    """Tokeniza o texto em palavras minúsculas (tokenização canônica do CEF)."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+@dataclass
+class TokenProfile:
+    """
+    Perfil de tokens de um texto, calculado em uma única passada.
+
+    Guarda tudo o que as métricas precisam (total, vocabulário único,
+    frequências e entropia de Shannon em bits), de modo que SD, S_H, μ,
+    CD e PC possam ser obtidos sem tokenizar o texto novamente.
+    """
+    total: int = 0
+    counts: Counter = field(default_factory=Counter)
+    entropy: float = 0.0
+
+    @classmethod
+    def from_text(cls, text: str) -> "TokenProfile":
+        """Tokeniza o texto uma vez e constrói o perfil."""
+        return cls.from_tokens(tokenize(text))
+
+    @classmethod
+    def from_tokens(cls, tokens: List[str]) -> "TokenProfile":
+        """Constrói o perfil a partir de tokens já extraídos."""
+        counts = Counter(tokens)
+        total = len(tokens)
+        entropy = 0.0
+        if total > 1:
+            entropy = -sum((c / total) * math.log2(c / total) for c in counts.values())
+        return cls(total=total, counts=counts, entropy=entropy)
+
+    @property
+    def unique(self) -> int:
+        """Tamanho do vocabulário único."""
+        return len(self.counts)
+
+
+TextOrProfile = Union[str, TokenProfile]
+
+
+def set_metrics_mode(mode: str) -> None:
+    """
+    Seleciona globalmente como textos viram perfis de tokens.
+
+    "exact" usa TokenProfile; "approximate" usa core.sketches.SketchProfile
+    (memória fixa, erro limitado). Para escolher por chamada, passe o
+    perfil desejado diretamente à métrica.
+    """
+    global _METRICS_MODE
+    if mode not in ("exact", "approximate"):
+        raise ValueError(f"Modo de métricas desconhecido: {mode}")
+    _METRICS_MODE = mode
+
+
+def get_metrics_mode() -> str:
+    """Retorna o modo global de perfis ("exact" ou "approximate")."""
+    return _METRICS_MODE
+
+
+def build_profile(text: str) -> TokenProfile:
+    """Constrói o perfil de tokens de um texto conforme o modo global."""
+    if _METRICS_MODE == "approximate":
+        from core.sketches import SketchProfile
+        return SketchProfile.from_text(text)
+    return TokenProfile.from_text(text)
+
+
+def enable_metrics_cache(maxsize: int = 4096) -> MetricsCache:
+    """
+    Ativa a memoização de calculate_sd, semantic_entropy e
+    lexical_coherence para entradas textuais e retorna o cache
+    (compartilhável entre threads).
+    """
+    global _METRICS_CACHE
+    _METRICS_CACHE = MetricsCache(maxsize)
+    return _METRICS_CACHE
+
+
+def disable_metrics_cache() -> None:
+    """Desativa a memoização das métricas."""
+    global _METRICS_CACHE
+    _METRICS_CACHE = None
+
+
+def metrics_cache_info() -> Optional[CacheInfo]:
+    """Acertos, erros e ocupação do cache ativo (None se desativado)."""
+    return _METRICS_CACHE.info() if _METRICS_CACHE is not None else None
+
+
+def _cached_scores(text: str) -> Tuple[float, float, float]:
+    """(SD, S_H, μ) de um texto, calculados juntos a partir de um único perfil."""
+    def compute() -> Tuple[float, float, float]:
+        profile = build_profile(text)
+        return calculate_sd(profile), semantic_entropy(profile), lexical_coherence(profile)
+
+    return _METRICS_CACHE.get_or_compute((content_hash(text), _METRICS_MODE), compute)
+
+
+def _use_cache(text: Any) -> bool:
+    return _METRICS_CACHE is not None and isinstance(text, str) and bool(text)
+
+
+def _is_profile(obj: Any) -> bool:
+    """Aceita qualquer objeto que exponha total, unique e entropy (TokenProfile, acumuladores)."""
+    return not isinstance(obj, str) and all(
+        hasattr(obj, attr) for attr in ("total", "unique", "entropy")
+    )
+
+
+def _as_profile(text: Any) -> Optional[TokenProfile]:
+    """Normaliza a entrada das métricas: texto vira perfil; outros tipos, None."""
+    if _is_profile(text):
+        return text
+    if text and isinstance(text, str):
+        return build_profile(text)
+    return None
 
 
 # ============================================================
 # 🔹 FUNÇÃO: calcular densidade semântica (SD)
 # ============================================================
 
-def calculate_sd(text: str) -> float:
+def calculate_sd(text: TextOrProfile) -> float:
     """
     Calcula a Densidade Semântica (SD) de um texto.
     
@@ -34,18 +173,17 @@ def calculate_sd(text: str) -> float:
       - Fator de coerência ≈ proporção de termos significativos
       - SD varia entre 0.0 e 1.0
     """
-    if not text or not isinstance(text, str):
-        return 0.0
+    if _use_cache(text):
+        return _cached_scores(text)[0]
 
-    tokens = re.findall(r"\b\w+\b", text.lower())
-    if len(tokens) == 0:
+    profile = _as_profile(text)
+    if profile is None or profile.total == 0:
         return 0.0
 
-    unique = set(tokens)
-    ratio = len(unique) / len(tokens)
+    ratio = profile.unique / profile.total
 
     # Ponderação: reduz impacto de textos muito curtos
-    coherence_factor = 1 - math.exp(-len(tokens) / 50)
+    coherence_factor = 1 - math.exp(-profile.total / 50)
     sd = min(1.0, ratio * coherence_factor)
 
     return round(sd, 4)
@@ -55,21 +193,20 @@ def calculate_sd(text: str) -> float:
 # 🔹 FUNÇÃO: calcular entropia semântica (S_H)
 # ============================================================
 
-def semantic_entropy(text: str) -> float:
+def semantic_entropy(text: TextOrProfile) -> float:
     """
     Mede a entropia semântica (S_H), ou dispersão lexical do texto.
     
     Base: Shannon Entropy aplicada ao vocabulário.
     """
-    tokens = re.findall(r"\b\w+\b", text.lower())
-    if len(tokens) <= 1:
-        return 0.0
+    if _use_cache(text):
+        return _cached_scores(text)[1]
 
-    counts = Counter(tokens)
-    total = sum(counts.values())
+    profile = _as_profile(text)
+    if profile is None or profile.total <= 1:
+        return 0.0
 
-    entropy = -sum((c / total) * math.log2(c / total) for c in counts.values())
-    normalized = entropy / math.log2(len(tokens))
+    normalized = profile.entropy / math.log2(profile.total)
     return round(normalized, 4)
 
 
@@ -77,13 +214,17 @@ def semantic_entropy(text: str) -> float:
 # 🔹 FUNÇÃO: coerência lexical (μ)
 # ============================================================
 
-def lexical_coherence(text: str) -> float:
+def lexical_coherence(text: TextOrProfile) -> float:
     """
     Mede a coerência lexical (μ) — regularidade semântica e repetição útil.
     μ = 1 - S_H (com ajuste para densidade)
     """
-    sd = calculate_sd(text)
-    sh = semantic_entropy(text)
+    if _use_cache(text):
+        return _cached_scores(text)[2]
+
+    profile = _as_profile(text)
+    sd = calculate_sd(profile)
+    sh = semantic_entropy(profile)
     mu = (1 - sh) * sd
     return round(mu, 4)
 
@@ -92,7 +233,7 @@ def lexical_coherence(text: str) -> float:
 # 🔹 FUNÇÃO: densidade de contexto (CD)
 # ============================================================
 
-def context_density(components: Dict[str, str]) -> float:
+def context_density(components: Dict[str, TextOrProfile]) -> float:
     """
     Calcula a densidade média ponderada do contexto total.
     
@@ -123,7 +264,7 @@ def context_density(components: Dict[str, str]) -> float:
 # 🔹 FUNÇÃO: pressão contextual (PC)
 # ============================================================
 
-def contextual_pressure(context: Dict[str, any]) -> float:
+def contextual_pressure(context: Dict[str, Any]) -> float:
     """
     Mede a Pressão Contextual (PC), que expressa a saturação semântica.
     
@@ -134,14 +275,18 @@ def contextual_pressure(context: Dict[str, any]) -> float:
       0.4–0.7 → racional (minimalismo)
       0.7–0.9 → criativo (saturação)
       >0.9   → entrópico (alucinação)
+
+    Cada componente textual é tokenizado uma única vez; o perfil
+    resultante é reaproveitado no cálculo de CD.
     """
-    tokens = []
-    for v in context.values():
-        if isinstance(v, str):
-            tokens += re.findall(r"\b\w+\b", v.lower())
+    profiles = {
+        k: v if _is_profile(v) else build_profile(v)
+        for k, v in context.items()
+        if isinstance(v, str) or _is_profile(v)
+    }
 
-    total_tokens = len(tokens)
-    cd = context_density(context)
+    total_tokens = sum(p.total for p in profiles.values())
+    cd = context_density(profiles)
 
     if total_tokens == 0:
         return 0.0
@@ -171,6 +316,89 @@ def classify_context_regime(sd: float, pc: float) -> str:
     return "Entrópico"
 
 
+# ============================================================
+# 🔹 ACUMULADOR: métricas online (histórico incremental)
+# ============================================================
+
+class OnlineContextMetrics:
+    """
+    Mantém total de tokens, vocabulário e entropia de Shannon de um
+    histórico crescente, em O(tokens novos) por atualização.
+
+    Usa a identidade H = log2(N) - (Σ c·log2 c) / N, atualizando apenas
+    os termos dos tokens afetados. Como expõe `total`, `unique` e
+    `entropy`, pode ser passado diretamente a calculate_sd,
+    semantic_entropy e lexical_coherence.
+
+    Com `window`, comporta-se como janela deslizante: ao exceder o
+    número de textos, o mais antigo é removido automaticamente.
+    """
+
+    def __init__(self, window: Optional[int] = None):
+        self.window = window
+        self.counts: Counter = Counter()
+        self.total = 0
+        self._c_log_c = 0.0
+        self._items: deque = deque()
+
+    @staticmethod
+    def _term(c: int) -> float:
+        return c * math.log2(c) if c > 0 else 0.0
+
+    def _apply(self, tokens: List[str], sign: int) -> None:
+        for token, delta in Counter(tokens).items():
+            old = self.counts[token]
+            new = old + sign * delta
+            self._c_log_c += self._term(new) - self._term(old)
+            if new:
+                self.counts[token] = new
+            else:
+                del self.counts[token]
+        self.total += sign * len(tokens)
+        if self.total == 0:
+            self._c_log_c = 0.0
+
+    def add(self, text: str) -> None:
+        """Acrescenta um texto ao histórico medido."""
+        tokens = tokenize(text) if text else []
+        self._apply(tokens, +1)
+        if self.window is not None:
+            self._items.append(tokens)
+            while len(self._items) > self.window:
+                self._apply(self._items.popleft(), -1)
+
+    def remove(self, text: str) -> None:
+        """Remove um texto previamente adicionado."""
+        tokens = tokenize(text) if text else []
+        needed = Counter(tokens)
+        if any(self.counts[t] < c for t, c in needed.items()):
+            raise ValueError("Texto não presente no histórico medido.")
+        self._apply(tokens, -1)
+        if self.window is not None and tokens in self._items:
+            self._items.remove(tokens)
+
+    @property
+    def unique(self) -> int:
+        """Tamanho do vocabulário único atual."""
+        return len(self.counts)
+
+    @property
+    def entropy(self) -> float:
+        """Entropia de Shannon (bits) do histórico atual."""
+        if self.total <= 1:
+            return 0.0
+        return max(0.0, math.log2(self.total) - self._c_log_c / self.total)
+
+    def summary(self) -> Dict[str, Any]:
+        """Snapshot das métricas do histórico (mesmos valores das funções em lote)."""
+        return {
+            "sd": calculate_sd(self),
+            "entropy": semantic_entropy(self),
+            "mu": lexical_coherence(self),
+            "tokens": self.total,
+        }
+
+
 # ============================================================
 # 🔹 TESTE RÁPIDO
 # ============================================================
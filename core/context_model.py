@@ -16,12 +16,16 @@ Versão: 1.0.0
 """
 
 from dataclasses import dataclass, field
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import datetime
 import uuid
 
 from core.context_metrics import (
+    OnlineContextMetrics,
+    TokenProfile,
+    build_profile,
     calculate_sd,
+    get_metrics_mode,
     context_density,
     contextual_pressure,
     classify_context_regime,
@@ -34,15 +38,57 @@ from core.context_metrics import (
 
 @dataclass
 class ContextComponent:
-    """Unidade de contexto (system, user, history, rag, tools)."""
+    """
+    Unidade de contexto (system, user, history, rag, tools).
+
+    As estatísticas de tokens ficam em cache e só são recalculadas
+    quando `content` é alterado (a atribuição marca a unidade como suja)
+    ou quando o modo de métricas (set_metrics_mode) muda.
+    """
     name: str
     content: str
     timestamp: str = field(default_factory=lambda: datetime.datetime.utcnow().isoformat())
     sd: float = 0.0
 
+    _profile: Optional[TokenProfile] = field(default=None, init=False, repr=False, compare=False)
+    _words: int = field(default=0, init=False, repr=False, compare=False)
+    _dirty: bool = field(default=True, init=False, repr=False, compare=False)
+    _mode: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    def __setattr__(self, key, value):
+        if key == "content":
+            object.__setattr__(self, "_dirty", True)
+        object.__setattr__(self, key, value)
+
+    def _refresh(self) -> None:
+        """Re-tokeniza o conteúdo apenas se ele (ou o modo de métricas) mudou."""
+        mode = get_metrics_mode()
+        if self._dirty or self._mode != mode:
+            self._profile = build_profile(self.content or "")
+            self._words = len(self.content.split()) if self.content else 0
+            self._dirty = False
+            self._mode = mode
+
+    @property
+    def dirty(self) -> bool:
+        """Indica se o conteúdo ou o modo de métricas mudou desde o último cálculo."""
+        return self._dirty or self._mode != get_metrics_mode()
+
+    @property
+    def profile(self) -> TokenProfile:
+        """Perfil de tokens em cache da unidade."""
+        self._refresh()
+        return self._profile
+
+    @property
+    def word_count(self) -> int:
+        """Número de palavras (split por espaço) em cache da unidade."""
+        self._refresh()
+        return self._words
+
     def analyze(self) -> None:
         """Calcula densidade semântica da unidade."""
-        self.sd = calculate_sd(self.content)
+        self.sd = calculate_sd(self.profile)
 
     def __repr__(self):
         return f"<{self.name.upper()} SD={self.sd:.2f}>"
@@ -76,18 +122,28 @@ class ContextState:
     regime: str = "Indefinido"
     tokens: int = 0
 
-    def update_metrics(self):
-        """Atualiza as métricas globais do contexto."""
-        components = {
-            "system": self.system.content,
-            "user": self.user.content,
-            "history": self.history.content,
-            "rag": self.rag.content,
-            "tools": self.tools.content,
+    def components(self) -> Dict[str, ContextComponent]:
+        """Retorna os cinco componentes indexados pelo nome."""
+        return {
+            "system": self.system,
+            "user": self.user,
+            "history": self.history,
+            "rag": self.rag,
+            "tools": self.tools,
         }
-        self.sd = context_density(components)
-        self.tokens = sum(len(v.split()) for v in components.values())
-        self.pc = contextual_pressure({**components, "tokens": self.tokens})
+
+    def update_metrics(self):
+        """
+        Atualiza as métricas globais do contexto.
+
+        Combina as estatísticas em cache de cada componente; apenas os
+        componentes cujo conteúdo mudou são re-tokenizados.
+        """
+        components = self.components()
+        profiles = {k: c.profile for k, c in components.items()}
+        self.sd = context_density(profiles)
+        self.tokens = sum(c.word_count for c in components.values())
+        self.pc = contextual_pressure({**profiles, "tokens": self.tokens})
         self.regime = classify_context_regime(self.sd, self.pc)
 
     def summary(self) -> Dict[str, Any]:
@@ -122,6 +178,7 @@ class ContextAgent:
         self.name = name
         self.mode = mode
         self.memory: List[Dict[str, str]] = []
+        self.memory_metrics = OnlineContextMetrics()
         self.state = ContextState(
             system=ContextComponent("system", system_prompt),
             user=ContextComponent("user", ""),
@@ -146,14 +203,21 @@ class ContextAgent:
         return "\n".join([m["content"] for m in self.memory[-k:]])
 
     def memorize(self, role: str, content: str):
-        """Armazena evento semântico na memória curta."""
+        """
+        Armazena evento semântico na memória curta.
+
+        As métricas da memória (SD, S_H, μ) são mantidas de forma
+        incremental em `memory_metrics`, com custo constante por turno.
+        """
         self.memory.append({
             "role": role,
             "content": content,
             "timestamp": datetime.datetime.utcnow().isoformat()
         })
+        self.memory_metrics.add(content)
         if len(self.memory) > 20:
-            self.memory.pop(0)  # compressão leve
+            evicted = self.memory.pop(0)  # compressão leve
+            self.memory_metrics.remove(evicted["content"])
 
     def describe_state(self) -> str:
         """Retorna descrição semântica do estado atual."""
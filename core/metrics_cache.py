@@ -0,0 +1,85 @@
+"""
+core/metrics_cache.py
+────────────────────────────────────────────
+Cache LRU thread-safe para as métricas do CEF.
+
+Os mesmos textos (DNA do agente, lista de ferramentas, documentos RAG,
+itens de histórico) são pontuados repetidamente. O cache guarda, por
+hash de conteúdo, o trio (SD, S_H, μ) calculado a partir de um único
+perfil de tokens — um acerto dispensa qualquer tokenização.
+
+Uso (opt-in):
+    from core.context_metrics import enable_metrics_cache
+    cache = enable_metrics_cache(maxsize=8192)
+    ...
+    print(cache.info())
+────────────────────────────────────────────
+Autor: Context Engineering Lab
+Licença: MIT
+Versão: 1.0.0
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Callable, Hashable, Tuple
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+def content_hash(text: str) -> bytes:
+    """Hash rápido (BLAKE2b, 128 bits) do conteúdo textual."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class MetricsCache:
+    """
+    Cache LRU limitado por número de entradas, seguro entre threads.
+
+    Pode ser compartilhado por todas as threads de um servidor de
+    agentes; as contagens de acertos/erros são globais.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        if maxsize <= 0:
+            raise ValueError("maxsize deve ser positivo.")
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Tuple[float, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Tuple[float, ...]]) -> Tuple[float, ...]:
+        """Retorna o valor em cache ou calcula (fora do lock) e armazena."""
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        """Esvazia o cache e zera os contadores."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Estatísticas no formato de functools.lru_cache."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,244 @@
+"""
+core/sketches.py
+────────────────────────────────────────────
+Modo aproximado das métricas para contextos muito grandes.
+
+Substitui o Counter/set exatos (memória ∝ vocabulário) por sketches
+de memória fixa e mescláveis entre blocos e workers:
+
+- HyperLogLog → vocabulário único (razão única do SD)
+  erro relativo padrão ≈ 1.04 / √(2^p)   (p=12 → ~1.6%)
+- EntropySketch (Clifford & Cosma, projeções estáveis α=1) → S_H
+  erro absoluto em bits ≈ 4.5 / √k com ~95% de confiança
+  (k=256 → ~0.28 bit, ou ~0.02 no S_H normalizado para N ≥ 2^14)
+
+SketchProfile expõe `total`, `unique` e `entropy`, como TokenProfile,
+e pode ser passado diretamente a calculate_sd, semantic_entropy,
+lexical_coherence, context_density e contextual_pressure (seleção por
+chamada). Para selecionar globalmente:
+
+    set_metrics_mode("approximate")
+
+Requisitos:
+    pip install numpy
+────────────────────────────────────────────
+Autor: Context Engineering Lab
+Licença: MIT
+Versão: 1.0.0
+"""
+
+import hashlib
+import math
+from collections import Counter
+from typing import Iterable, List
+
+import numpy as np
+
+from core.context_metrics import _TOKEN_RE
+
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+# ============================================================
+# 🔹 HASHING ESTÁVEL
+# ============================================================
+
+def hash_tokens(tokens: Iterable[str]) -> np.ndarray:
+    """Hash de 64 bits estável entre processos (independe de PYTHONHASHSEED)."""
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest(), "little")
+         for t in tokens),
+        dtype=np.uint64,
+    )
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    """Mistura de bits splitmix64 (aritmética uint64 com wraparound)."""
+    x = x + _GOLDEN
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    """Comprimento em bits exato de cada uint64 (busca binária por deslocamentos)."""
+    x = x.copy()
+    n = np.zeros(x.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = x >= (np.uint64(1) << np.uint64(shift))
+        n[big] += shift
+        x[big] >>= np.uint64(shift)
+    return n + (x > 0)
+
+
+# ============================================================
+# 🔹 HYPERLOGLOG: vocabulário único
+# ============================================================
+
+class HyperLogLog:
+    """Contador de cardinalidade com 2^p registradores de 1 byte."""
+
+    def __init__(self, p: int = 12):
+        if not 4 <= p <= 18:
+            raise ValueError("p deve estar entre 4 e 18.")
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        """Registra hashes de 64 bits."""
+        if hashes.size == 0:
+            return
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = (hashes << np.uint64(self.p)) & _MASK64
+        rank = np.where(rest == 0, 64 - self.p + 1, 64 - _bit_length(rest) + 1)
+        np.maximum.at(self.registers, idx, rank.astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Incorpora outro sketch com o mesmo p (união dos conjuntos)."""
+        if other.p != self.p:
+            raise ValueError("Sketches HyperLogLog com p diferentes.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        """Cardinalidade estimada."""
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            return self.m * math.log(self.m / zeros)
+        return float(raw)
+
+
+# ============================================================
+# 🔹 ENTROPY SKETCH: entropia de Shannon
+# ============================================================
+
+class EntropySketch:
+    """
+    Sketch linear de entropia (Clifford & Cosma, 2013).
+
+    Cada token recebe k variáveis estáveis maximamente assimétricas,
+    derivadas deterministicamente do seu hash; o sketch acumula
+    y_j = Σ c_i · r_ij. Como é linear, mesclar = somar.
+    """
+
+    def __init__(self, k: int = 256, seed: int = 0, block: int = 2048):
+        self.k = k
+        self.seed = seed
+        self.block = block
+        self.y = np.zeros(k, dtype=np.float64)
+        self.total = 0
+        self._salts = _splitmix64(np.arange(2 * k, dtype=np.uint64) + np.uint64(seed))
+
+    def _variates(self, hashes: np.ndarray) -> np.ndarray:
+        bits = _splitmix64(hashes[:, None] ^ self._salts[None, :])
+        u = ((bits >> np.uint64(11)).astype(np.float64) + 0.5) / float(1 << 53)
+        w1 = np.pi * (u[:, :self.k] - 0.5)
+        w2 = -np.log(u[:, self.k:])
+        half_pi = np.pi / 2 - w1
+        return np.tan(w1) * half_pi + np.log(w2 * np.cos(w1) / half_pi)
+
+    def add_hashes(self, hashes: np.ndarray, counts: np.ndarray) -> None:
+        """Registra tokens (hashes) com suas frequências."""
+        counts = np.asarray(counts, dtype=np.float64)
+        for start in range(0, hashes.size, self.block):
+            end = start + self.block
+            self.y += counts[start:end] @ self._variates(hashes[start:end])
+        self.total += int(counts.sum())
+
+    def merge(self, other: "EntropySketch") -> None:
+        """Incorpora outro sketch com os mesmos k e seed."""
+        if (other.k, other.seed) != (self.k, self.seed):
+            raise ValueError("EntropySketch com parâmetros diferentes.")
+        self.y += other.y
+        self.total += other.total
+
+    def estimate(self) -> float:
+        """Entropia estimada em bits."""
+        if self.total <= 1:
+            return 0.0
+        z = self.y / self.total
+        shift = z.max()
+        h_nat = -(shift + math.log(np.mean(np.exp(z - shift))))
+        return max(0.0, h_nat / math.log(2))
+
+
+# ============================================================
+# 🔹 PERFIL APROXIMADO
+# ============================================================
+
+class SketchProfile:
+    """
+    Perfil de tokens aproximado, com memória fixa (~4 KB + 8·k bytes).
+
+    Interface compatível com TokenProfile (`total`, `unique`, `entropy`).
+    """
+
+    def __init__(self, p: int = 12, k: int = 256, seed: int = 0):
+        self.hll = HyperLogLog(p)
+        self.sketch = EntropySketch(k, seed)
+
+    @classmethod
+    def from_text(cls, text: str, chunk_tokens: int = 65_536, **params) -> "SketchProfile":
+        """Constrói o perfil varrendo o texto em blocos de tokens."""
+        profile = cls(**params)
+        chunk: List[str] = []
+        for match in _TOKEN_RE.finditer(text.lower() if text else ""):
+            chunk.append(match.group())
+            if len(chunk) >= chunk_tokens:
+                profile.update(chunk)
+                chunk = []
+        profile.update(chunk)
+        return profile
+
+    def update(self, tokens: List[str]) -> None:
+        """Acrescenta um bloco de tokens ao perfil."""
+        if not tokens:
+            return
+        counts = Counter(tokens)
+        hashes = hash_tokens(counts.keys())
+        self.hll.add_hashes(hashes)
+        self.sketch.add_hashes(hashes, np.fromiter(counts.values(), dtype=np.float64))
+
+    def merge(self, other: "SketchProfile") -> "SketchProfile":
+        """Mescla outro perfil (outro bloco ou worker) neste."""
+        self.hll.merge(other.hll)
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def total(self) -> int:
+        return self.sketch.total
+
+    @property
+    def unique(self) -> int:
+        if self.total == 0:
+            return 0
+        return int(min(self.total, max(1, round(self.hll.estimate()))))
+
+    @property
+    def entropy(self) -> float:
+        if self.total <= 1:
+            return 0.0
+        return min(self.sketch.estimate(), math.log2(self.total))
+
+
+# ============================================================
+# 🔹 TESTE RÁPIDO
+# ============================================================
+
+if __name__ == "__main__":
+    import random
+
+    from core.context_metrics import calculate_sd, semantic_entropy
+
+    random.seed(0)
+    vocab = [f"termo{i}" for i in range(20_000)]
+    text = " ".join(random.choice(vocab) for _ in range(200_000))
+
+    approx = SketchProfile.from_text(text)
+    print(f"SD exato = {calculate_sd(text)} | aproximado = {calculate_sd(approx)}")
+    print(f"S_H exato = {semantic_entropy(text)} | aproximado = {semantic_entropy(approx)}")
@@ -12,7 +12,21 @@ Descrição:
 
 Módulos:
     rag_manager      – Recuperação e reranking semântico (RAG)
+    rag_async        – Pipeline RAG assíncrono multi-fonte
+    retrieval_cache  – Cache LRU + TTL de consultas com invalidação por versão
+    bm25             – Índice invertido BM25 (recuperação lexical)
+    document_store   – SD, tamanho e termos pré-calculados por documento
+    sharding         – BM25 scatter-gather entre processos
+    segments         – Ingestão incremental em segmentos BM25 imutáveis
+    hybrid           – Fusão BM25 + densa (RRF / ponderada)
+    vector_index     – Índice denso flat / IVF com persistência mmap
     compression      – Compressão e sumarização semântica
+    embedders        – Backends de embeddings (carregamento preguiçoso)
+    embedding_cache  – Cache persistente de embeddings (memória + disco)
+    embedding_pool   – Embedding multiprocesso com memória compartilhada
+    quantization     – Embeddings compactos (float16 / int8)
+    dedup            – Quase-duplicatas via MinHash + LSH
+    chunking         – Segmentação em streaming de textos e arquivos
     context_optimizer – (opcional) Regulação dinâmica de SD/PC
     memory_neo4j     – Persistência e continuidade identitária
 """
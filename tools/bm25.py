@@ -0,0 +1,192 @@
+"""
+tools/bm25.py
+-------------
+
+Recuperador lexical BM25 com índice invertido para o CEF.
+
+Objetivo:
+    Substituir a varredura linear de `recuperar_documentos` por um índice
+    invertido: o custo de cada consulta cresce com as postings tocadas,
+    não com o tamanho do corpus, e o resultado é determinístico entre
+    processos (sem `hash()` do Python).
+
+Funcionamento:
+    - Tokenização idêntica à de calculate_sd (core.context_metrics.tokenize)
+    - Postings por termo: {doc_id: tf}, mais tf máximo e menor documento
+      de cada termo para limitar o score que o termo pode contribuir
+    - Avaliação termo-a-termo (maior limite primeiro) com terminação
+      antecipada: quando o k-ésimo score supera a soma dos limites dos
+      termos restantes, nenhum documento novo entra no top-k e apenas
+      os acumuladores existentes são atualizados (estratégia "continue")
+    - Top-k final por heap; empates resolvidos pelo menor doc_id
+"""
+
+import copy
+import heapq
+import itertools
+import math
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from core.context_metrics import tokenize
+
+# Versões únicas no processo, compartilhadas por BM25Index, SegmentedIndex
+# e ShardedRetriever: um índice nunca herda a versão de outro (ver RetrievalCache)
+_VERSIONS = itertools.count(1)
+
+# ------------------------------------------------------------------------
+# 📚 Índice Invertido
+# ------------------------------------------------------------------------
+
+class BM25Index:
+    """
+    Índice invertido com scoring Okapi BM25.
+
+    Args:
+        documents (Iterable[str]): Documentos iniciais (ids = posição).
+        k1 (float): Saturação da frequência do termo.
+        b (float): Normalização pelo tamanho do documento.
+    """
+
+    def __init__(self, documents: Iterable[str] = (), k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs: List[str] = []
+        self.doc_len: List[int] = []
+        self.total_len = 0
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self._max_tf: Dict[str, int] = {}
+        self._min_len: Dict[str, int] = {}
+        self.version = next(_VERSIONS)
+        self.add_documents(documents)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add_documents(self, documents: Iterable[str]) -> List[int]:
+        """Indexa novos documentos e retorna seus ids."""
+        ids = []
+        for doc in documents:
+            doc_id = len(self.docs)
+            counts = Counter(tokenize(doc) if doc else [])
+            length = sum(counts.values())
+            self.docs.append(doc)
+            self.doc_len.append(length)
+            self.total_len += length
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+                self._max_tf[term] = max(self._max_tf.get(term, 0), tf)
+                self._min_len[term] = min(self._min_len.get(term, length), length)
+            ids.append(doc_id)
+        if ids:
+            self.version = next(_VERSIONS)
+        return ids
+
+    def with_documents(self, documents: Iterable[str]) -> "BM25Index":
+        """
+        Cópia do índice com os documentos adicionados; o original não muda
+        e pode continuar sendo consultado por outras threads. Postings de
+        termos que os novos documentos não tocam são compartilhados.
+        """
+        documents = list(documents)
+        grown = copy.copy(self)
+        grown.docs = list(self.docs)
+        grown.doc_len = list(self.doc_len)
+        grown.postings = dict(self.postings)
+        grown._max_tf = dict(self._max_tf)
+        grown._min_len = dict(self._min_len)
+        for term in {term for doc in documents if doc for term in tokenize(doc)}:
+            if term in grown.postings:
+                grown.postings[term] = dict(grown.postings[term])
+        grown.add_documents(documents)
+        return grown
+
+    @property
+    def avgdl(self) -> float:
+        return self.total_len / len(self.docs) if self.docs else 0.0
+
+    def df(self, term: str) -> int:
+        """Número de documentos que contêm o termo."""
+        return len(self.postings.get(term, ()))
+
+    # --------------------------------------------------------------------
+    # 🔍 Busca
+    # --------------------------------------------------------------------
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Retorna os k documentos de maior score BM25.
+
+        Returns:
+            List[Tuple[int, float]]: (doc_id, score) em ordem decrescente.
+        """
+        return self._search(Counter(tokenize(query)), k, len(self.docs), self.avgdl, self.df)
+
+    def _search(self, query_terms: Counter, k: int, n_docs: int, avgdl: float,
+                df: Callable[[str], int], exclude: Optional[Set[int]] = None) -> List[Tuple[int, float]]:
+        """
+        Busca com estatísticas de coleção externas (n_docs, avgdl, df),
+        usadas quando o índice é um segmento/shard de um corpus maior.
+        Documentos em `exclude` (tombstones) são ignorados.
+        """
+        if k <= 0 or not self.docs or avgdl <= 0:
+            return []
+        k1, b = self.k1, self.b
+
+        plan = []
+        for term, qtf in query_terms.items():
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            n_t = max(df(term), 1)
+            idf = math.log(1 + (n_docs - n_t + 0.5) / (n_t + 0.5))
+            max_tf = self._max_tf[term]
+            bound = qtf * idf * (k1 + 1) * max_tf / (max_tf + k1 * (1 - b + b * self._min_len[term] / avgdl))
+            plan.append((bound, term, qtf, idf, postings))
+        plan.sort(key=lambda p: (-p[0], p[1]))
+
+        # Limite dos termos ainda não processados (somas de sufixo, sem cancelamento)
+        suffix = [0.0] * (len(plan) + 1)
+        for i in range(len(plan) - 1, -1, -1):
+            suffix[i] = suffix[i + 1] + plan[i][0]
+
+        acc: Dict[int, float] = {}
+        frozen = False
+        for i, (bound, term, qtf, idf, postings) in enumerate(plan):
+            remaining = suffix[i + 1]
+            weight = qtf * idf * (k1 + 1)
+            if frozen and len(acc) < len(postings):
+                items = ((d, postings[d]) for d in list(acc) if d in postings)
+            else:
+                items = postings.items()
+            for doc_id, tf in items:
+                if exclude and doc_id in exclude:
+                    continue
+                if frozen and doc_id not in acc:
+                    continue
+                norm = tf + k1 * (1 - b + b * self.doc_len[doc_id] / avgdl)
+                acc[doc_id] = acc.get(doc_id, 0.0) + weight * tf / norm
+
+            if len(acc) >= k:
+                threshold = heapq.nlargest(k, acc.values())[-1]
+                if threshold > remaining:
+                    frozen = True
+                    # Candidatos que não alcançam o k-ésimo score saem do heap
+                    acc = {d: s for d, s in acc.items() if s + remaining >= threshold}
+
+        return heapq.nlargest(k, acc.items(), key=lambda item: (item[1], -item[0]))
+
+
+# ------------------------------------------------------------------------
+# 🧪 Teste Local
+# ------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    corpus = [
+        "A densidade semântica é a métrica que mede coerência interna de um texto.",
+        "Pressão contextual é o grau de saturação cognitiva entre lógica e criatividade.",
+        "O modo minimalista favorece precisão e inferência determinística.",
+    ]
+    index = BM25Index(corpus)
+    for doc_id, score in index.search("densidade semântica e coerência", k=2):
+        print(f"{score:.3f}  {corpus[doc_id]}")
@@ -0,0 +1,140 @@
+"""
+tools/chunking.py
+-----------------
+
+Chunker em streaming para o Context Engineering Framework (CEF).
+
+Objetivo:
+    Transformar históricos e payloads RAG em texto puro (ou arquivos)
+    em chunks para a compressão semântica, com memória limitada: o
+    texto é lido em blocos e apenas a unidade incompleta do fim de cada
+    bloco e a janela corrente ficam em memória. Cada bloco é varrido uma
+    única vez, e uma unidade sem fronteira (ex.: texto sem pontuação) é
+    cortada ao passar de `max_unit_chars`, no último espaço disponível.
+
+Estratégias:
+    sentence   – agrupa `size` frases (padrão 1)
+    paragraph  – agrupa `size` parágrafos (linhas em branco separam)
+    tokens     – janelas de `size` palavras (padrão 200)
+
+    `overlap` repete as últimas unidades de um chunk no início do próximo.
+"""
+
+import re
+from collections import deque
+from typing import IO, Iterable, Iterator, Optional, Union
+
+Source = Union[str, IO[str], Iterable[str]]
+
+_BOUNDARIES = {
+    "sentence": (re.compile(r"(?<=[.!?…])\s+"), " ", 1),
+    "paragraph": (re.compile(r"\n\s*\n"), "\n\n", 1),
+    "tokens": (re.compile(r"\s+"), " ", 200),
+}
+
+# ------------------------------------------------------------------------
+# 📥 Leitura em Blocos
+# ------------------------------------------------------------------------
+
+def _iter_blocks(source: Source, block_size: int) -> Iterator[str]:
+    """Lê a fonte (str, arquivo ou iterável de str) em blocos de texto."""
+    if isinstance(source, str):
+        for start in range(0, len(source), block_size):
+            yield source[start:start + block_size]
+    elif hasattr(source, "read"):
+        while True:
+            block = source.read(block_size)
+            if not block:
+                break
+            yield block
+    else:
+        yield from source
+
+
+def _iter_units(blocks: Iterable[str], boundary: "re.Pattern", max_chars: int) -> Iterator[str]:
+    """
+    Divide o fluxo de blocos em unidades, retendo só a unidade incompleta
+    (no máximo `max_chars` caracteres). Todas as fronteiras começam com
+    espaço em branco, então só o espaço final da unidade pendente e o
+    bloco novo precisam ser varridos.
+    """
+    pending = ""
+    for block in blocks:
+        scan = len(pending.rstrip())
+        pending += block
+        start = 0
+        for match in boundary.finditer(pending, scan):
+            unit = pending[start:match.start()].strip()
+            if unit:
+                yield unit
+            start = match.end()
+        while len(pending) - start > max_chars:
+            limit = start + max_chars
+            cut = max(pending.rfind(" ", start, limit), pending.rfind("\n", start, limit))
+            cut = cut if cut > start else limit
+            unit = pending[start:cut].strip()
+            if unit:
+                yield unit
+            start = cut
+        pending = pending[start:]
+    if pending.strip():
+        yield pending.strip()
+
+
+# ------------------------------------------------------------------------
+# ✂️ Chunker
+# ------------------------------------------------------------------------
+
+def iter_chunks(source: Source, strategy: str = "sentence", size: Optional[int] = None,
+                overlap: int = 0, block_size: int = 1 << 16,
+                max_unit_chars: int = 1 << 16) -> Iterator[str]:
+    """
+    Gera chunks de um texto, arquivo aberto ou iterável de strings.
+
+    Args:
+        source (Source): Texto, file handle ou iterável de fragmentos.
+        strategy (str): "sentence", "paragraph" ou "tokens".
+        size (int): Unidades por chunk (padrão: 1 frase/parágrafo, 200 palavras).
+        overlap (int): Unidades repetidas entre chunks consecutivos.
+        block_size (int): Caracteres lidos por vez.
+        max_unit_chars (int): Tamanho máximo de uma unidade; unidades
+            maiores são cortadas (limita a memória em textos sem fronteira).
+
+    Yields:
+        str: Próximo chunk.
+    """
+    if strategy not in _BOUNDARIES:
+        raise ValueError(f"Estratégia de chunking desconhecida: {strategy}")
+    boundary, joiner, default_size = _BOUNDARIES[strategy]
+    size = size or default_size
+    if not 0 <= overlap < size:
+        raise ValueError("overlap deve estar entre 0 e size - 1.")
+    if max_unit_chars <= 0:
+        raise ValueError("max_unit_chars deve ser positivo.")
+
+    window: deque = deque()
+    fresh = 0
+    for unit in _iter_units(_iter_blocks(source, block_size), boundary, max_unit_chars):
+        window.append(unit)
+        fresh += 1
+        if len(window) == size:
+            yield joiner.join(window)
+            for _ in range(size - overlap):
+                window.popleft()
+            fresh = 0
+    if fresh:
+        yield joiner.join(window)
+
+
+def as_chunks(value, strategy: str = "sentence", **options):
+    """
+    Normaliza um campo de contexto para uma lista de chunks.
+
+    Strings e arquivos passam pelo chunker; listas e outros iteráveis
+    de chunks são mantidos como estão; valores vazios (None, []) viram [].
+    """
+    if isinstance(value, str) or hasattr(value, "read"):
+        return list(iter_chunks(value, strategy, **options))
+    if not value:
+        return []
+    return list(value)
@@ -13,82 +13,559 @@ Conceito:
     Aqui, buscamos manter o "núcleo informacional" (vetor semântico)
     mesmo com perda lexical.
 
+Embeddings:
+    O backend é injetável (ver tools/embedders.py). Por padrão usa
+    SentenceTransformerEmbedder("all-MiniLM-L6-v2"), carregado apenas
+    na primeira compressão; workers sem os pesos podem usar
+    set_default_embedder(HashingEmbedder()).
+
 Requisitos:
-    pip install sentence-transformers numpy scikit-learn
+    pip install numpy
+    pip install sentence-transformers   (backend padrão)
 """
 
-from typing import List, Dict, Tuple
-from sentence_transformers import SentenceTransformer, util
+from typing import List, Dict, Optional, Tuple
 import numpy as np
 from core.context_metrics import calculate_sd
+from tools.chunking import as_chunks
+from tools.dedup import NearDuplicateFilter
+from tools.embedders import Embedder, SentenceTransformerEmbedder
 
 # ------------------------------------------------------------------------
 # ⚙️ Modelo de Embeddings
 # ------------------------------------------------------------------------
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+_default_embedder: Optional[Embedder] = None
+
+
+def get_default_embedder() -> Embedder:
+    """Retorna o embedder padrão (criado sob demanda, sem carregar o modelo)."""
+    global _default_embedder
+    if _default_embedder is None:
+        _default_embedder = SentenceTransformerEmbedder("all-MiniLM-L6-v2")
+    return _default_embedder
+
+
+def set_default_embedder(embedder: Embedder) -> None:
+    """Define o embedder usado quando nenhum é passado explicitamente."""
+    global _default_embedder
+    _default_embedder = embedder
+
+
+def _centroid_similarities(embeddings: np.ndarray) -> np.ndarray:
+    """Similaridade de cosseno de cada embedding com o centróide do conjunto."""
+    embeddings = np.asarray(embeddings, dtype=np.float64)
+    centroid = embeddings.mean(axis=0)
+    norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(centroid)
+    return (embeddings @ centroid) / np.maximum(norms, 1e-12)
+
+
+def _top_k_indices(similarities: np.ndarray, rate: float) -> np.ndarray:
+    """
+    Índices dos k mais próximos do centróide, em ordem decrescente
+    (empates resolvidos pelo menor índice).
+    """
+    k = max(1, int(len(similarities) * rate))
+    order = np.lexsort((np.arange(len(similarities)), -similarities))
+    return order[:k]
+
+
+def _segmented_similarities(embeddings: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Versão segmentada de _centroid_similarities.
+
+    `embeddings` concatena vários grupos de chunks (comprimentos em
+    `lengths`); cada linha é comparada ao centróide do próprio grupo,
+    com operações vetorizadas sobre o array plano.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    seg = np.repeat(np.arange(len(lengths)), lengths)
+    nonempty = lengths > 0
+
+    centroids = np.zeros((len(lengths), embeddings.shape[1]))
+    centroids[nonempty] = np.add.reduceat(embeddings, starts[nonempty], axis=0) / lengths[nonempty, None]
+
+    row_centroids = centroids[seg]
+    norms = np.linalg.norm(embeddings, axis=1) * np.linalg.norm(row_centroids, axis=1)
+    return np.einsum("ij,ij->i", embeddings, row_centroids) / np.maximum(norms, 1e-12)
+
+
+def _segmented_top_k(embeddings: np.ndarray, lengths: np.ndarray, rate: float) -> List[np.ndarray]:
+    """Top-k por grupo (mesma regra de _top_k_indices) sobre o array plano."""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    seg = np.repeat(np.arange(len(lengths)), lengths)
+    sims = _segmented_similarities(embeddings, lengths)
+
+    # Ordena por (grupo, -similaridade, índice) e mantém os k primeiros de cada grupo
+    order = np.lexsort((np.arange(len(sims)), -sims, seg))
+    k = np.maximum(1, (lengths * rate).astype(np.int64))
+    rank = np.arange(len(order)) - starts[seg[order]]
+    keep = order[rank < k[seg[order]]]
+
+    bounds = np.cumsum(np.minimum(k, lengths))[:-1]
+    return [idx - start for idx, start in zip(np.split(keep, bounds), starts)]
+
+
+def _mmr_indices(embeddings: np.ndarray, similarities: np.ndarray, k: int,
+                 mmr_lambda: float = 0.7) -> np.ndarray:
+    """
+    Seleção por Maximal Marginal Relevance em O(k·n·d).
+
+    score = λ · relevância − (1 − λ) · máx. similaridade com os já
+    escolhidos. O vetor de similaridade máxima é atualizado de forma
+    incremental com um único produto matriz-vetor por passo.
+    """
+    n = len(similarities)
+    k = min(k, n)
+    unit = np.asarray(embeddings, dtype=np.float64)
+    unit = unit / np.maximum(np.linalg.norm(unit, axis=1, keepdims=True), 1e-12)
+
+    selected = np.empty(k, dtype=np.int64)
+    available = np.ones(n, dtype=bool)
+    max_sim = np.zeros(n)
+    score = mmr_lambda * similarities
+
+    for step in range(k):
+        j = int(np.argmax(np.where(available, score, -np.inf)))
+        selected[step] = j
+        available[j] = False
+        max_sim = unit @ unit[j] if step == 0 else np.maximum(max_sim, unit @ unit[j])
+        score = mmr_lambda * similarities - (1 - mmr_lambda) * max_sim
+    return selected
+
+
+def _select_indices(embeddings: np.ndarray, similarities: np.ndarray, rate: float,
+                    strategy: str = "centroid", mmr_lambda: float = 0.7) -> np.ndarray:
+    """Aplica a estratégia de seleção ("centroid" ou "mmr") a um grupo de chunks."""
+    if strategy == "centroid":
+        return _top_k_indices(similarities, rate)
+    if strategy == "mmr":
+        k = max(1, int(len(similarities) * rate))
+        return _mmr_indices(embeddings, similarities, k, mmr_lambda)
+    raise ValueError(f"Estratégia de compressão desconhecida: {strategy}")
+
+
+def _budgeted_selection(values: np.ndarray, weights: np.ndarray, budget: int) -> np.ndarray:
+    """
+    Knapsack guloso: ordena por valor/token e adiciona enquanto couber,
+    com contabilidade incremental de tokens. Compara com o melhor item
+    isolado, o que garante ao menos metade do valor ótimo.
+
+    Returns:
+        np.ndarray: Máscara booleana dos itens selecionados.
+    """
+    n = len(values)
+    ratio = np.where(weights > 0, values / np.maximum(weights, 1), np.inf)
+    order = np.lexsort((np.arange(n), -ratio))
+
+    chosen = np.zeros(n, dtype=bool)
+    used = 0
+    for i in order:
+        if used + weights[i] <= budget:
+            chosen[i] = True
+            used += weights[i]
+
+    fits = np.flatnonzero(weights <= budget)
+    if len(fits):
+        best = fits[np.argmax(values[fits])]
+        if values[best] > values[chosen].sum():
+            chosen[:] = False
+            chosen[best] = True
+    return chosen
+
+
+def _assemble_compressed(context: Dict[str, any], selected: Dict[str, List[str]]) -> Dict[str, any]:
+    """Monta o contexto comprimido a partir dos chunks selecionados por campo."""
+    compressed = {}
+
+    # Campos diretos (não comprimidos)
+    compressed["system"] = context.get("system", "")
+    compressed["user"] = context.get("user", "")
+    compressed.update(selected)
+
+    compressed["tools"] = context.get("tools", [])
+    compressed["tokens"] = sum(len(x.split()) for x in compressed.get("history", [])) + \
+                           sum(len(x.split()) for x in compressed.get("rag", []))
+
+    compressed["sd"] = calculate_sd(str(compressed))
+    return compressed
 
 # ------------------------------------------------------------------------
 # 🧠 Funções Principais
 # ------------------------------------------------------------------------
 
-def semantic_compression(chunks: List[str], compression_rate: float = 0.5) -> List[str]:
+def semantic_compression(chunks: List[str], compression_rate: float = 0.5,
+                         embedder: Optional[Embedder] = None,
+                         strategy: str = "centroid", mmr_lambda: float = 0.7,
+                         dedup: Optional[NearDuplicateFilter] = None,
+                         chunking: str = "sentence") -> List[str]:
     """
     Realiza compressão semântica por similaridade vetorial.
 
     Args:
-        chunks (List[str]): Lista de segmentos de texto.
+        chunks (List[str]): Lista de segmentos de texto (ou texto/arquivo,
+            segmentado em streaming por tools.chunking).
         compression_rate (float): Percentual de conteúdo a manter (0–1).
+        embedder (Embedder): Backend de embeddings (padrão: get_default_embedder()).
+        strategy (str): "centroid" (top-k por similaridade ao centróide) ou
+            "mmr" (Maximal Marginal Relevance, evita chunks quase idênticos).
+        mmr_lambda (float): Peso da relevância no MMR (1.0 = só centróide).
+        dedup (NearDuplicateFilter): Se fornecido, colapsa quase-duplicatas
+            antes do embedding (a taxa se aplica aos chunks restantes).
+        chunking (str): Estratégia de segmentação para entradas textuais
+            ("sentence", "paragraph" ou "tokens").
 
     Returns:
         List[str]: Subconjunto semanticamente representativo.
     """
+    chunks = as_chunks(chunks, chunking)
     if not chunks:
         return []
 
-    embeddings = model.encode(chunks, convert_to_tensor=True)
-    centroid = embeddings.mean(dim=0)
-    similarities = util.cos_sim(embeddings, centroid).cpu().numpy().flatten()
+    if dedup is not None:
+        chunks, _ = dedup.collapse(chunks)
 
-    # Seleciona top-k mais próximos do centro semântico
-    k = max(1, int(len(chunks) * compression_rate))
-    top_indices = similarities.argsort()[-k:][::-1]
+    embedder = embedder or get_default_embedder()
+    embeddings = embedder.encode(chunks)
+    similarities = _centroid_similarities(embeddings)
+
+    # Seleciona top-k mais próximos do centro semântico (ou diversos, via MMR)
+    top_indices = _select_indices(embeddings, similarities, compression_rate, strategy, mmr_lambda)
 
     return [chunks[i] for i in top_indices]
 
 
-def compress_context(context: Dict[str, any], keep_ratio: float = 0.6) -> Dict[str, any]:
+def compress_context(context: Dict[str, any], keep_ratio: float = 0.6,
+                     embedder: Optional[Embedder] = None,
+                     max_tokens: Optional[int] = None,
+                     strategy: str = "centroid", mmr_lambda: float = 0.7,
+                     dedup: Optional[NearDuplicateFilter] = None,
+                     chunking: str = "sentence") -> Dict[str, any]:
     """
     Aplica compressão semântica seletiva em um contexto completo.
 
+    `history` e `rag` podem ser listas de chunks, textos ou arquivos
+    abertos; textos e arquivos são segmentados em streaming.
+
     Args:
         context (Dict): Estrutura contextual (system, user, history, rag)
         keep_ratio (float): Fator de retenção média do contexto.
+        embedder (Embedder): Backend de embeddings (padrão: get_default_embedder()).
+        max_tokens (int): Orçamento rígido de tokens para history + rag.
+            Quando definido, substitui `keep_ratio` (ver compress_to_budget);
+            `dedup` é repassado, mas apenas strategy="centroid" é suportado.
+        strategy (str): Estratégia de seleção ("centroid" ou "mmr").
+        mmr_lambda (float): Peso da relevância no MMR.
+        dedup (NearDuplicateFilter): Colapsa quase-duplicatas antes do embedding.
+        chunking (str): Segmentação de campos textuais ("sentence", "paragraph", "tokens").
 
     Returns:
         Dict[str, any]: Novo contexto comprimido.
     """
-    compressed = {}
+    if max_tokens is not None:
+        if strategy != "centroid":
+            raise ValueError(f"max_tokens não é compatível com strategy='{strategy}'.")
+        return compress_to_budget(context, max_tokens, embedder, chunking, dedup)
 
-    # Campos diretos (não comprimidos)
-    compressed["system"] = context.get("system", "")
-    compressed["user"] = context.get("user", "")
+    selected = {}
 
     # Compressão seletiva
     if "history" in context:
-        compressed["history"] = semantic_compression(context["history"], keep_ratio)
+        selected["history"] = semantic_compression(context["history"], keep_ratio, embedder,
+                                                   strategy, mmr_lambda, dedup, chunking)
 
     if "rag" in context:
-        compressed["rag"] = semantic_compression(context["rag"], keep_ratio)
+        selected["rag"] = semantic_compression(context["rag"], keep_ratio, embedder,
+                                               strategy, mmr_lambda, dedup, chunking)
 
-    compressed["tools"] = context.get("tools", [])
-    compressed["tokens"] = sum(len(x.split()) for x in compressed.get("history", [])) + \
-                           sum(len(x.split()) for x in compressed.get("rag", []))
+    return _assemble_compressed(context, selected)
 
-    compressed["sd"] = calculate_sd(str(compressed))
+
+def compress_to_budget(context: Dict[str, any], max_tokens: int,
+                       embedder: Optional[Embedder] = None,
+                       chunking: str = "sentence",
+                       dedup: Optional[NearDuplicateFilter] = None) -> Dict[str, any]:
+    """
+    Comprime `history` e `rag` sob um orçamento rígido de tokens.
+
+    Cada chunk vale (1 + similaridade com o centróide do seu campo) / 2
+    e custa len(chunk.split()) tokens (a mesma contagem de "tokens" do
+    contexto comprimido). A seleção maximiza o valor total sem exceder
+    `max_tokens`; os chunks mantidos preservam a ordem original.
+
+    Args:
+        context (Dict): Estrutura contextual (system, user, history, rag)
+        max_tokens (int): Orçamento para history + rag (system/user não entram).
+        embedder (Embedder): Backend de embeddings (padrão: get_default_embedder()).
+        chunking (str): Segmentação de campos textuais ("sentence", "paragraph", "tokens").
+        dedup (NearDuplicateFilter): Colapsa quase-duplicatas de cada campo
+            antes do embedding (as cópias colapsadas entram em "dropped").
+
+    Returns:
+        Dict[str, any]: Contexto comprimido com "tokens", "sd",
+        "budget" e "dropped" (chunks descartados por campo).
+    """
+    fields = [(name, as_chunks(context[name], chunking)) for name in ("history", "rag") if name in context]
+    collapsed: Dict[str, List[str]] = {name: [] for name, _ in fields}
+    if dedup is not None:
+        deduped = []
+        for name, group in fields:
+            representatives, mapping = dedup.collapse(group)
+            seen = set()
+            for chunk, rep in zip(group, mapping):
+                if rep in seen:
+                    collapsed[name].append(chunk)
+                seen.add(rep)
+            deduped.append((name, representatives))
+        fields = deduped
+    chunks = [c for _, group in fields for c in group]
+
+    chosen = np.zeros(0, dtype=bool)
+    if chunks:
+        embedder = embedder or get_default_embedder()
+        lengths = np.array([len(group) for _, group in fields])
+        values = (1 + _segmented_similarities(embedder.encode(chunks), lengths)) / 2
+        weights = np.array([len(c.split()) for c in chunks], dtype=np.int64)
+        chosen = _budgeted_selection(values, weights, max_tokens)
+
+    selected, dropped = {}, {}
+    offset = 0
+    for name, group in fields:
+        mask = chosen[offset:offset + len(group)]
+        selected[name] = [c for c, keep in zip(group, mask) if keep]
+        dropped[name] = [c for c, keep in zip(group, mask) if not keep] + collapsed[name]
+        offset += len(group)
+
+    compressed = _assemble_compressed(context, selected)
+    compressed["budget"] = max_tokens
+    compressed["dropped"] = dropped
     return compressed
 
 
+def compress_contexts(contexts: List[Dict[str, any]], keep_ratio: float = 0.6,
+                      embedder: Optional[Embedder] = None,
+                      strategy: str = "centroid", mmr_lambda: float = 0.7,
+                      dedup: Optional[NearDuplicateFilter] = None,
+                      chunking: str = "sentence") -> List[Dict[str, any]]:
+    """
+    Comprime vários contextos com uma única chamada de embedding.
+
+    Todos os chunks de `history` e `rag` de todos os contextos são
+    embeddados num só lote; centróides e top-k por campo são obtidos
+    com operações segmentadas. O resultado equivale a chamar
+    compress_context em cada contexto (salvo arredondamento de ponto
+    flutuante do backend em lotes diferentes).
+
+    Args:
+        contexts (List[Dict]): Estruturas contextuais (system, user, history, rag).
+        keep_ratio (float): Fator de retenção média do contexto.
+        embedder (Embedder): Backend de embeddings (padrão: get_default_embedder()).
+        strategy (str): Estratégia de seleção ("centroid" ou "mmr").
+        mmr_lambda (float): Peso da relevância no MMR.
+        dedup (NearDuplicateFilter): Colapsa quase-duplicatas antes do embedding.
+        chunking (str): Segmentação de campos textuais ("sentence", "paragraph", "tokens").
+
+    Returns:
+        List[Dict[str, any]]: Contextos comprimidos, na mesma ordem.
+    """
+    groups: List[Tuple[int, str, List[str]]] = []
+    for i, context in enumerate(contexts):
+        for name in ("history", "rag"):
+            if name in context:
+                chunks = as_chunks(context[name], chunking)
+                if dedup is not None and chunks:
+                    chunks, _ = dedup.collapse(chunks)
+                groups.append((i, name, chunks))
+
+    selected: List[Dict[str, List[str]]] = [{} for _ in contexts]
+    nonempty = [g for g in groups if g[2]]
+    for i, name, chunks in groups:
+        if not chunks:
+            selected[i][name] = []
+
+    if nonempty:
+        embedder = embedder or get_default_embedder()
+        all_chunks = [c for _, _, chunks in nonempty for c in chunks]
+        embeddings = embedder.encode(all_chunks)
+        lengths = np.array([len(chunks) for _, _, chunks in nonempty])
+        if strategy == "centroid":
+            tops = _segmented_top_k(embeddings, lengths, keep_ratio)
+        else:
+            sims = _segmented_similarities(embeddings, lengths)
+            bounds = np.cumsum(lengths)[:-1]
+            tops = [_select_indices(e, s, keep_ratio, strategy, mmr_lambda)
+                    for e, s in zip(np.split(embeddings, bounds), np.split(sims, bounds))]
+        for (i, name, chunks), top in zip(nonempty, tops):
+            selected[i][name] = [chunks[j] for j in top]
+
+    return [_assemble_compressed(ctx, {k: sel[k] for k in ("history", "rag") if k in sel})
+            for ctx, sel in zip(contexts, selected)]
+
+
+# ------------------------------------------------------------------------
+# 🔁 Compressão Incremental de Histórico
+# ------------------------------------------------------------------------
+
+class HistoryCompressor:
+    """
+    Compressão incremental do histórico de uma sessão.
+
+    Mantém os embeddings de todos os turnos vivos numa matriz
+    pré-alocada (linhas reaproveitadas após despejos), a soma corrente
+    (centróide) e o conjunto comprimido atual. A cada `add`, apenas os
+    turnos novos são embeddados e a seleção é refeita somente entre o
+    conjunto atual e os turnos novos, numa única operação vetorizada.
+    Uma reconstrução completa (sem re-embedding) ocorre a cada
+    `rebuild_every` atualizações ou quando o centróide deriva mais que
+    `drift_tolerance` desde a última.
+
+    Custo por turno: proporcional ao conjunto mantido (≈ keep_ratio ×
+    turnos vivos). Sem `window` ele cresce com a sessão; com `window` a
+    matriz tem tamanho fixo e o custo por turno é constante.
+
+    Após `rebuild()`, o resultado coincide com
+    semantic_compression(turnos, keep_ratio) sobre os mesmos turnos.
+
+    Args:
+        keep_ratio (float): Fração de turnos a manter.
+        embedder (Embedder): Backend de embeddings (padrão: get_default_embedder()).
+        window (int): Máximo de turnos vivos; os mais antigos são despejados
+            (necessário para custo constante por turno).
+        rebuild_every (int): Atualizações entre reconstruções completas.
+        drift_tolerance (float): Deriva máxima (1 − cos) do centróide.
+    """
+
+    def __init__(self, keep_ratio: float = 0.6, embedder: Optional[Embedder] = None,
+                 window: Optional[int] = None, rebuild_every: int = 50,
+                 drift_tolerance: float = 0.05):
+        self.keep_ratio = keep_ratio
+        self.embedder = embedder
+        self.window = window
+        self.rebuild_every = rebuild_every
+        self.drift_tolerance = drift_tolerance
+
+        self._texts: Dict[int, str] = {}
+        self._rows: Dict[int, int] = {}  # id do turno → linha da matriz
+        self._free: List[int] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._norms = np.zeros(0, dtype=np.float64)
+        self._next_id = 0
+        self._sum: Optional[np.ndarray] = None
+        self._kept = np.zeros(0, dtype=np.int64)  # ids mantidos, do mais ao menos central
+        self._kept_rows = np.zeros(0, dtype=np.int64)
+        self._rebuild_centroid: Optional[np.ndarray] = None
+        self._updates = 0
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    @property
+    def centroid(self) -> Optional[np.ndarray]:
+        """Centróide corrente dos turnos vivos."""
+        if not self._texts:
+            return None
+        return self._sum / len(self._texts)
+
+    def drift(self) -> float:
+        """1 − cos entre o centróide atual e o da última reconstrução."""
+        if self._rebuild_centroid is None or self.centroid is None:
+            return 0.0
+        a, b = self.centroid, self._rebuild_centroid
+        return float(1 - a @ b / max(np.linalg.norm(a) * np.linalg.norm(b), 1e-12))
+
+    def _store(self, vectors: np.ndarray) -> List[int]:
+        """Grava os vetores em linhas livres (dobrando a matriz se preciso)."""
+        if self._matrix is None:
+            capacity = max(len(vectors), self.window or 0, 16)
+            self._matrix = np.zeros((capacity, vectors.shape[1]), dtype=np.float64)
+            self._norms = np.zeros(capacity, dtype=np.float64)
+            self._free = list(range(capacity - 1, -1, -1))
+        if len(self._free) < len(vectors):
+            old = len(self._matrix)
+            capacity = max(2 * old, old + len(vectors))
+            self._matrix = np.vstack([self._matrix, np.zeros((capacity - old, self._matrix.shape[1]))])
+            self._norms = np.concatenate([self._norms, np.zeros(capacity - old)])
+            self._free = list(range(capacity - 1, old - 1, -1)) + self._free
+        rows = [self._free.pop() for _ in range(len(vectors))]
+        self._matrix[rows] = vectors
+        self._norms[rows] = np.linalg.norm(vectors, axis=1)
+        return rows
+
+    def _select(self, candidates: np.ndarray, rows: np.ndarray) -> None:
+        """Mantém os candidatos (ids + linhas) mais próximos do centróide."""
+        if not len(candidates):
+            self._kept, self._kept_rows = candidates, rows
+            return
+        centroid = self.centroid
+        norms = self._norms[rows] * np.linalg.norm(centroid)
+        sims = (self._matrix[rows] @ centroid) / np.maximum(norms, 1e-12)
+        k = min(len(candidates), max(1, int(len(self._texts) * self.keep_ratio)))
+        order = np.lexsort((candidates, -sims))[:k]
+        self._kept, self._kept_rows = candidates[order], rows[order]
+
+    def _oldest(self) -> int:
+        return next(iter(self._texts), self._next_id)
+
+    def add(self, turns) -> List[str]:
+        """
+        Incorpora novos turnos (texto ou lista de textos) e retorna o
+        histórico comprimido atualizado.
+        """
+        turns = [turns] if isinstance(turns, str) else list(turns)
+        if turns:
+            embedder = self.embedder or get_default_embedder()
+            vectors = np.asarray(embedder.encode(turns), dtype=np.float64)
+            new_ids = np.arange(self._next_id, self._next_id + len(turns), dtype=np.int64)
+            self._next_id += len(turns)
+            new_rows = np.array(self._store(vectors), dtype=np.int64)
+            for i, text, row in zip(new_ids.tolist(), turns, new_rows.tolist()):
+                self._texts[i] = text
+                self._rows[i] = row
+            self._sum = vectors.sum(axis=0) if self._sum is None else self._sum + vectors.sum(axis=0)
+            self._evict()
+            self._updates += 1
+
+            # A primeira atualização fixa o centróide de referência da deriva
+            if (self._rebuild_centroid is None or self._updates >= self.rebuild_every
+                    or self.drift() > self.drift_tolerance):
+                self.rebuild()
+            else:
+                live = new_ids >= self._oldest()
+                self._select(np.concatenate([self._kept, new_ids[live]]),
+                             np.concatenate([self._kept_rows, new_rows[live]]))
+        return self.compressed()
+
+    def _evict(self) -> None:
+        if self.window is None:
+            return
+        while len(self._texts) > self.window:
+            oldest = next(iter(self._texts))
+            del self._texts[oldest]
+            row = self._rows.pop(oldest)
+            self._sum = self._sum - self._matrix[row]
+            self._free.append(row)
+        # Turnos são despejados do mais antigo ao mais novo: basta comparar ids
+        live = self._kept >= self._oldest()
+        self._kept, self._kept_rows = self._kept[live], self._kept_rows[live]
+
+    def rebuild(self) -> List[str]:
+        """Recalcula a seleção sobre todos os turnos vivos (sem re-embedding)."""
+        if self._texts:
+            rows = np.fromiter(self._rows.values(), dtype=np.int64, count=len(self._rows))
+            self._sum = self._matrix[rows].sum(axis=0)
+            self._select(np.fromiter(self._texts, dtype=np.int64, count=len(self._texts)), rows)
+        self._rebuild_centroid = self.centroid
+        self._updates = 0
+        return self.compressed()
+
+    def compressed(self) -> List[str]:
+        """Histórico comprimido atual, do mais ao menos central."""
+        return [self._texts[i] for i in self._kept.tolist()]
+
+
 def summarize_context(context: Dict[str, any], max_tokens: int = 500) -> str:
     """
     Gera uma versão resumida e compacta do contexto, semântico e factual.
@@ -0,0 +1,156 @@
+"""
+tools/dedup.py
+--------------
+
+Detector de quase-duplicatas (MinHash + LSH) para o Context Engineering Framework (CEF).
+
+Objetivo:
+    Colapsar chunks quase idênticos (retentativas, mensagens citadas,
+    boilerplate) antes das etapas caras — embedding na compressão e
+    reranking no RAG — mantendo o mapeamento para os originais.
+
+Funcionamento:
+    1. Cada texto vira um conjunto de shingles (n-gramas de tokens).
+    2. A assinatura MinHash estima a similaridade de Jaccard.
+    3. O LSH em bandas encontra candidatos sem comparar todos os pares;
+       cada candidato é confirmado pela Jaccard estimada ≥ threshold.
+
+Requisitos:
+    pip install numpy
+"""
+
+import hashlib
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from core.context_metrics import tokenize
+
+_MERSENNE = np.uint64((1 << 31) - 1)
+
+# ------------------------------------------------------------------------
+# ⚙️ Parâmetros LSH
+# ------------------------------------------------------------------------
+
+def _lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Escolhe (bandas, linhas) cujo limiar (1/b)^(1/r) mais se aproxima de threshold."""
+    best = (num_perm, 1)
+    best_err = float("inf")
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        err = abs((1 / bands) ** (1 / rows) - threshold)
+        if err < best_err:
+            best, best_err = (bands, rows), err
+    return best
+
+
+# ------------------------------------------------------------------------
+# 🧬 Detector de Quase-Duplicatas
+# ------------------------------------------------------------------------
+
+class NearDuplicateFilter:
+    """
+    Agrupa textos quase duplicados via MinHash + LSH.
+
+    Args:
+        threshold (float): Jaccard mínima (estimada) para considerar duplicata.
+        num_perm (int): Número de permutações MinHash.
+        shingle_size (int): Tamanho dos n-gramas de tokens.
+        seed (int): Semente das permutações (resultado determinístico).
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128,
+                 shingle_size: int = 3, seed: int = 1):
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold deve estar em (0, 1].")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.bands, self.rows = _lsh_params(threshold, num_perm)
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_MERSENNE), num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE), num_perm, dtype=np.uint64)
+
+    def _shingles(self, text: str) -> np.ndarray:
+        tokens = tokenize(text) if text else []
+        n = self.shingle_size
+        grams = {" ".join(tokens[i:i + n]) for i in range(max(1, len(tokens) - n + 1))}
+        return np.fromiter(
+            (int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little")
+             for g in grams),
+            dtype=np.uint64,
+        )
+
+    def signature(self, text: str) -> np.ndarray:
+        """Assinatura MinHash (num_perm valores) de um texto."""
+        shingles = self._shingles(text)
+        hashed = (self._a[:, None] * shingles[None, :] + self._b[:, None]) % _MERSENNE
+        return hashed.min(axis=1)
+
+    def collapse(self, texts: Sequence[str]) -> Tuple[List[str], List[int]]:
+        """
+        Colapsa quase-duplicatas, mantendo a primeira ocorrência de cada grupo.
+
+        Returns:
+            Tuple[List[str], List[int]]: (representantes, mapeamento) onde
+            mapeamento[i] é o índice, em representantes, do texto original i.
+        """
+        representatives: List[str] = []
+        rep_signatures: List[np.ndarray] = []
+        mapping: List[int] = []
+        buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+
+        for text in texts:
+            sig = self.signature(text)
+            keys = [(band, sig[band * self.rows:(band + 1) * self.rows].tobytes())
+                    for band in range(self.bands)]
+
+            match = -1
+            seen = set()
+            for key in keys:
+                for rep in buckets.get(key, ()):
+                    if rep in seen:
+                        continue
+                    seen.add(rep)
+                    if np.mean(rep_signatures[rep] == sig) >= self.threshold:
+                        match = rep
+                        break
+                if match >= 0:
+                    break
+
+            if match < 0:
+                match = len(representatives)
+                representatives.append(text)
+                rep_signatures.append(sig)
+                for key in keys:
+                    buckets[key].append(match)
+            mapping.append(match)
+
+        return representatives, mapping
+
+    @staticmethod
+    def groups(mapping: List[int]) -> Dict[int, List[int]]:
+        """Índices originais agrupados por representante."""
+        grouped: Dict[int, List[int]] = defaultdict(list)
+        for original, rep in enumerate(mapping):
+            grouped[rep].append(original)
+        return dict(grouped)
+
+
+# ------------------------------------------------------------------------
+# 🧪 Teste Local
+# ------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    textos = [
+        "A densidade semântica mede a concentração de sentido no contexto.",
+        "A densidade semântica mede a concentração de sentido no contexto!",
+        "Pressão contextual controla a entropia cognitiva do agente.",
+        "> A densidade semântica mede a concentração de sentido no contexto.",
+    ]
+    reps, mapa = NearDuplicateFilter(threshold=0.7).collapse(textos)
+    print("Representantes:", reps)
+    print("Mapeamento:", mapa)
@@ -0,0 +1,216 @@
+"""
+tools/document_store.py
+-----------------------
+
+Armazém de documentos com estatísticas pré-calculadas para o RAG do CEF.
+
+Objetivo:
+    `calcular_relevancia_semantica` recalcula calculate_sd(doc) e refaz
+    o split/lowercase do documento para cada par consulta-documento, e
+    `injetar_no_contexto` calcula a SD dos vencedores de novo. O store
+    calcula uma única vez, na ingestão, tudo o que depende apenas do
+    documento; o reranking paga só a parte que depende da consulta.
+
+Arrays (um elemento por documento, id = posição):
+    sd       – float64, calculate_sd(doc)
+    lengths  – int64, len(doc.split())
+    indptr / indices – conjunto de termos de doc.lower().split() em
+               formato CSR: ids de vocabulário ordenados de
+               indices[indptr[i]:indptr[i + 1]]
+
+Reranking em lote:
+    relevance() pontua todos os candidatos de uma vez (interseção de
+    termos sobre as linhas CSR + SD numa única expressão NumPy) e
+    top_k() seleciona os k melhores com argpartition, com os mesmos
+    scores e a mesma ordem de empates de rerank_semantico.
+
+Observação:
+    A SD é calculada no modo de métricas ativo na ingestão
+    (set_metrics_mode); documentos ingeridos em modo aproximado
+    guardam a SD aproximada.
+
+Requisitos:
+    pip install numpy
+"""
+
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from core.context_metrics import calculate_sd
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    """Garante capacidade para `size` elementos (dobrando o buffer)."""
+    if size <= len(array):
+        return array
+    grown = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+# ------------------------------------------------------------------------
+# 🗃️ Armazém de Documentos
+# ------------------------------------------------------------------------
+
+class DocumentStore:
+    """
+    Documentos + SD, tamanho e conjunto de termos pré-calculados.
+
+    Args:
+        documents (Iterable[str]): Documentos iniciais.
+    """
+
+    def __init__(self, documents: Iterable[str] = ()):
+        self.docs: List[str] = []
+        self.vocabulary: Dict[str, int] = {}
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        # Buffers com capacidade dobrada sob demanda: ingerir um documento
+        # custa O(termos) amortizado e nunca reconstrói o CSR inteiro.
+        self._n = 0
+        self._nnz = 0
+        self._sd = np.zeros(16, dtype=np.float64)
+        self._lengths = np.zeros(16, dtype=np.int64)
+        self._indptr = np.zeros(17, dtype=np.int64)
+        self._indices = np.zeros(256, dtype=np.int64)
+        self.add_documents(documents)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def __contains__(self, doc: str) -> bool:
+        return doc in self._ids
+
+    # --------------------------------------------------------------------
+    # ✍️ Ingestão
+    # --------------------------------------------------------------------
+
+    def add_documents(self, documents: Iterable[str]) -> List[int]:
+        """Ingere documentos (textos repetidos reutilizam o id existente)."""
+        with self._lock:
+            return [self._add(doc) for doc in documents]
+
+    def _add(self, doc: str) -> int:
+        doc_id = self._ids.get(doc)
+        if doc_id is not None:
+            return doc_id
+        doc_id = len(self.docs)
+        terms = sorted({self.vocabulary.setdefault(t, len(self.vocabulary)) for t in doc.lower().split()})
+        end = self._nnz + len(terms)
+
+        self._sd = _grow(self._sd, doc_id + 1)
+        self._lengths = _grow(self._lengths, doc_id + 1)
+        self._indptr = _grow(self._indptr, doc_id + 2)
+        self._indices = _grow(self._indices, end)
+        self._sd[doc_id] = calculate_sd(doc)
+        self._lengths[doc_id] = len(doc.split())
+        self._indices[self._nnz:end] = terms
+        self._indptr[doc_id + 1] = end
+
+        self.docs.append(doc)
+        self._ids[doc] = doc_id
+        self._n, self._nnz = doc_id + 1, end
+        return doc_id
+
+    def ids(self, docs: Sequence[str]) -> np.ndarray:
+        """Ids dos documentos; textos ainda não vistos são ingeridos."""
+        with self._lock:
+            return np.array([self._add(doc) for doc in docs], dtype=np.int64)
+
+    # --------------------------------------------------------------------
+    # 📐 Arrays Compactos
+    # --------------------------------------------------------------------
+
+    def _compact(self):
+        """Visões (sd, lengths, indptr, indices) dos documentos já ingeridos."""
+        with self._lock:
+            n, nnz = self._n, self._nnz
+            return self._sd[:n], self._lengths[:n], self._indptr[:n + 1], self._indices[:nnz]
+
+    @property
+    def sd(self) -> np.ndarray:
+        return self._compact()[0]
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return self._compact()[1]
+
+    @property
+    def indptr(self) -> np.ndarray:
+        return self._compact()[2]
+
+    @property
+    def indices(self) -> np.ndarray:
+        return self._compact()[3]
+
+    def sd_of(self, doc: str) -> float:
+        """SD pré-calculada de um documento (ingere se necessário)."""
+        return float(self.sd[self.ids([doc])[0]])
+
+    # --------------------------------------------------------------------
+    # 📊 Relevância
+    # --------------------------------------------------------------------
+
+    def relevance(self, query: str, doc_ids: Sequence[int]) -> np.ndarray:
+        """
+        Mesmo score de calcular_relevancia_semantica para um lote de
+        documentos, numa única expressão vetorizada:
+
+            min(1, 0.6 · |termos(q) ∩ termos(d)| / |q| + 0.4 · SD(d))
+
+        A interseção é contada sobre as linhas CSR dos candidatos
+        (np.isin contra os ids de vocabulário da consulta).
+        """
+        sd, _, indptr, indices = self._compact()
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        query_terms = np.array(
+            sorted({self.vocabulary[t] for t in query.lower().split() if t in self.vocabulary}),
+            dtype=np.int64,
+        )
+
+        starts, ends = indptr[doc_ids], indptr[doc_ids + 1]
+        sizes = ends - starts
+        offsets = np.zeros(len(doc_ids) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        positions = np.repeat(starts - offsets[:-1], sizes) + np.arange(offsets[-1])
+        hits = np.zeros(offsets[-1] + 1, dtype=np.int64)
+        np.cumsum(np.isin(indices[positions], query_terms), out=hits[1:])
+        shared = hits[offsets[1:]] - hits[offsets[:-1]]
+
+        denom = max(len(query.split()), 1)
+        return np.minimum(1.0, 0.6 * (shared / denom) + 0.4 * sd[doc_ids])
+
+    def top_k(self, query: str, doc_ids: Sequence[int], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k por relevância via argpartition.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (posições em doc_ids, scores) em
+            ordem decrescente; empates mantêm a ordem de entrada, como o
+            sorted() estável de rerank_semantico.
+        """
+        scores = self.relevance(query, doc_ids)
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        top = np.flatnonzero(scores >= kth)  # inclui todos os empatados no k-ésimo
+        top = top[np.lexsort((top, -scores[top]))][:k]
+        return top, scores[top]
+
+
+# ------------------------------------------------------------------------
+# 🧪 Teste Local
+# ------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from tools.rag_manager import MOCK_CORPUS, calcular_relevancia_semantica
+
+    store = DocumentStore(MOCK_CORPUS)
+    query = "Explique o papel da densidade semântica no raciocínio contextual."
+    fast = store.relevance(query, np.arange(len(store))).tolist()
+    slow = [calcular_relevancia_semantica(query, doc) for doc in MOCK_CORPUS]
+    print("Scores idênticos:", fast == slow)
+    print("SD:", store.sd, "| termos por documento:", np.diff(store.indptr))
@@ -0,0 +1,107 @@
+"""
+tools/embedders.py
+------------------
+
+Backends de embeddings plugáveis para o Context Engineering Framework (CEF).
+
+Objetivo:
+    Desacoplar compressão e RAG de um modelo específico. Qualquer objeto
+    com `model_id` e `encode(texts) -> np.ndarray` serve como Embedder.
+
+Backends:
+    SentenceTransformerEmbedder – modelo real, carregado no primeiro uso
+    HashingEmbedder             – determinístico e offline (sem download)
+
+Requisitos:
+    pip install numpy
+    pip install sentence-transformers   (apenas para SentenceTransformerEmbedder)
+"""
+
+import hashlib
+import threading
+from typing import List, Optional, Protocol, Sequence, runtime_checkable
+
+import numpy as np
+
+from core.context_metrics import tokenize
+
+# ------------------------------------------------------------------------
+# 🧩 Protocolo
+# ------------------------------------------------------------------------
+
+@runtime_checkable
+class Embedder(Protocol):
+    """Interface mínima de um backend de embeddings."""
+
+    model_id: str
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Retorna uma matriz (len(texts), dim) de float32."""
+        ...
+
+
+# ------------------------------------------------------------------------
+# 🧠 Sentence-Transformers (carregamento preguiçoso)
+# ------------------------------------------------------------------------
+
+class SentenceTransformerEmbedder:
+    """
+    Embedder baseado em sentence-transformers.
+
+    O modelo só é importado e carregado na primeira chamada a `encode`,
+    de modo que importar `tools` não paga o custo do modelo.
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", device: Optional[str] = None):
+        self.model_name = model_name
+        self.device = device
+        self.model_id = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name, device=self.device)
+        return self._model
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        if len(texts) == 0:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = self._load().encode(list(texts), convert_to_numpy=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+# ------------------------------------------------------------------------
+# #️⃣ Hashing (offline, determinístico)
+# ------------------------------------------------------------------------
+
+class HashingEmbedder:
+    """
+    Embedder por feature hashing de unigramas e bigramas de tokens.
+
+    Não requer modelo nem rede; o resultado é estável entre processos
+    e máquinas (BLAKE2b, independente de PYTHONHASHSEED). Vetores são
+    normalizados em L2.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.model_id = f"hashing-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        tokens = tokenize(text) if text else []
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                h = int.from_bytes(digest, "little")
+                out[row, h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
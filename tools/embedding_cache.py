@@ -0,0 +1,253 @@
+"""
+tools/embedding_cache.py
+------------------------
+
+Cache persistente de embeddings para o Context Engineering Framework (CEF).
+
+Objetivo:
+    Evitar re-embeddar turnos de histórico e chunks RAG inalterados.
+    A chave é o hash do conteúdo + o identificador do modelo.
+
+Camadas:
+    1. Memória   – LRU limitado por número de vetores, opcionalmente
+                   quantizado (float16/int8, ver tools/quantization.py)
+    2. Disco     – array float32 memory-mapped (<modelo>.f32) + índice
+                   append-only (<modelo>.idx, linhas "hash linha").
+                   Sobrevive a reinícios e pode ser aberto por vários
+                   processos; com read_only=True o worker apenas lê.
+
+Uso:
+    cache = EmbeddingCache("all-MiniLM-L6-v2", path="~/.cache/cef")
+    embedder = CachedEmbedder(SentenceTransformerEmbedder(), cache)
+    semantic_compression(chunks, 0.5, embedder=embedder)
+
+Requisitos:
+    pip install numpy
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from tools.embedders import Embedder
+from tools.quantization import dequantize, quantize
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# ------------------------------------------------------------------------
+# 🔑 Chave de Cache
+# ------------------------------------------------------------------------
+
+def embedding_key(model_id: str, text: str) -> str:
+    """Hash (BLAKE2b, 128 bits) de modelo + conteúdo."""
+    return hashlib.blake2b(f"{model_id}\0{text}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+# ------------------------------------------------------------------------
+# 💾 Cache em Duas Camadas
+# ------------------------------------------------------------------------
+
+class EmbeddingCache:
+    """
+    Cache de embeddings com camada LRU em memória e camada em disco.
+
+    Args:
+        model_id (str): Identificador do modelo (faz parte da chave e do nome dos arquivos).
+        path (str): Diretório da camada em disco (None = apenas memória).
+        maxsize (int): Máximo de vetores na camada em memória.
+        read_only (bool): Não grava no disco (workers consumidores).
+        dtype (str): Formato da camada em memória ("float32", "float16"
+            ou "int8"); o disco permanece em float32.
+    """
+
+    def __init__(self, model_id: str, path: Optional[str] = None,
+                 maxsize: int = 10_000, read_only: bool = False, dtype: str = "float32"):
+        self.model_id = model_id
+        self.maxsize = maxsize
+        self.dtype = dtype
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.dim: Optional[int] = None
+        self._index: Dict[str, int] = {}
+        self._index_offset = 0
+        self._mmap: Optional[np.memmap] = None
+
+        self.path = os.path.expanduser(path) if path else None
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+            stem = re.sub(r"[^A-Za-z0-9_.-]", "_", model_id)
+            self._data_file = os.path.join(self.path, f"{stem}.f32")
+            self._index_file = os.path.join(self.path, f"{stem}.idx")
+            self._meta_file = os.path.join(self.path, f"{stem}.json")
+            self._refresh()
+
+    # --------------------------------------------------------------------
+    # 📖 Leitura
+    # --------------------------------------------------------------------
+
+    def _refresh(self) -> None:
+        """Lê novas linhas do índice e remapeia o array se ele cresceu."""
+        if self.dim is None and os.path.exists(self._meta_file):
+            with open(self._meta_file) as f:
+                self.dim = json.load(f)["dim"]
+        if self.dim is None or not os.path.exists(self._index_file):
+            return
+
+        with open(self._index_file) as f:
+            f.seek(self._index_offset)
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # linha ainda sendo escrita por outro processo
+                key, row = line.split()
+                self._index[key] = int(row)
+                self._index_offset += len(line.encode("utf-8"))
+
+        rows = os.path.getsize(self._data_file) // (4 * self.dim)
+        if rows and (self._mmap is None or self._mmap.shape[0] < rows):
+            self._mmap = np.memmap(self._data_file, dtype=np.float32, mode="r", shape=(rows, self.dim))
+
+    def _from_disk(self, key: str) -> Optional[np.ndarray]:
+        row = self._index.get(key)
+        if row is None or self._mmap is None or row >= self._mmap.shape[0]:
+            return None
+        return np.array(self._mmap[row])
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Retorna o embedding em cache de um texto, ou None."""
+        return self.get_many([text])[0]
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Embeddings em cache de um lote de textos (None para os ausentes).
+        O índice em disco é relido no máximo uma vez por lote.
+        """
+        keys = [embedding_key(self.model_id, t) for t in texts]
+        found: List[Optional[np.ndarray]] = [None] * len(keys)
+        with self._lock:
+            absent = []
+            for i, key in enumerate(keys):
+                stored = self._memory.get(key)
+                if stored is not None:
+                    self._memory.move_to_end(key)
+                    found[i] = dequantize(*stored)[0]
+                elif self.path:
+                    found[i] = self._from_disk(key)
+                if found[i] is None:
+                    absent.append(i)
+                elif stored is None:
+                    self._remember(key, found[i])
+
+            if absent and self.path:
+                self._refresh()
+                for i in absent:
+                    found[i] = self._from_disk(keys[i])
+                    if found[i] is not None:
+                        self._remember(keys[i], found[i])
+
+            misses = sum(1 for vector in found if vector is None)
+            self.misses += misses
+            self.hits += len(found) - misses
+        return found
+
+    # --------------------------------------------------------------------
+    # ✍️ Escrita
+    # --------------------------------------------------------------------
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        data, scales = quantize(vector[None, :], self.dtype)
+        self._memory[key] = (data, scales)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray) -> None:
+        """Armazena embeddings nas duas camadas (disco apenas se gravável)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        keys = [embedding_key(self.model_id, t) for t in texts]
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+            if self.path and not self.read_only and len(keys):
+                self._append(keys, vectors)
+
+    def _append(self, keys: List[str], vectors: np.ndarray) -> None:
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            if not os.path.exists(self._meta_file):
+                with open(self._meta_file, "w") as f:
+                    json.dump({"model_id": self.model_id, "dim": self.dim}, f)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Dimensão {vectors.shape[1]} difere da do cache ({self.dim}).")
+
+        with open(self._index_file, "a") as idx:
+            if fcntl is not None:
+                fcntl.flock(idx, fcntl.LOCK_EX)
+            try:
+                # Vetores primeiro, índice depois: leitores nunca veem
+                # uma linha de índice sem os dados correspondentes.
+                with open(self._data_file, "ab") as data:
+                    # Um escritor interrompido no meio de uma linha deixa
+                    # bytes sem entrada no índice: descartá-los realinha
+                    # as próximas linhas.
+                    size = os.fstat(data.fileno()).st_size
+                    first_row = size // (4 * self.dim)
+                    if size != first_row * 4 * self.dim:
+                        data.truncate(first_row * 4 * self.dim)
+                    data.write(np.ascontiguousarray(vectors).tobytes())
+                idx.write("".join(f"{k} {first_row + i}\n" for i, k in enumerate(keys)))
+                idx.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(idx, fcntl.LOCK_UN)
+
+    def info(self) -> Dict[str, int]:
+        """Estatísticas de uso do cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory": len(self._memory),
+            "disk": len(self._index),
+        }
+
+
+# ------------------------------------------------------------------------
+# 🧠 Embedder com Cache
+# ------------------------------------------------------------------------
+
+class CachedEmbedder:
+    """
+    Envolve um Embedder: textos já vistos vêm do cache e os demais são
+    embeddados numa única chamada ao backend e gravados no cache.
+    """
+
+    def __init__(self, embedder: Embedder, cache: Optional[EmbeddingCache] = None):
+        self.embedder = embedder
+        self.model_id = embedder.model_id
+        self.cache = cache or EmbeddingCache(embedder.model_id)
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        cached = self.cache.get_many(texts)
+        missing = [i for i, v in enumerate(cached) if v is None]
+
+        if missing:
+            fresh = self.embedder.encode([texts[i] for i in missing])
+            self.cache.put_many([texts[i] for i in missing], fresh)
+            for i, vector in zip(missing, fresh):
+                cached[i] = vector
+
+        if not cached:
+            return np.zeros((0, self.cache.dim or 0), dtype=np.float32)
+        return np.vstack(cached).astype(np.float32, copy=False)
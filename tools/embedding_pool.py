@@ -0,0 +1,201 @@
+"""
+tools/embedding_pool.py
+-----------------------
+
+Pool de processos para embedding de grandes volumes de chunks (CEF).
+
+Objetivo:
+    Usar todos os núcleos de CPU na compressão offline de corpora.
+    As listas de chunks são divididas em shards entre N processos; cada
+    worker carrega o modelo uma única vez e grava seus vetores direto
+    num array de `multiprocessing.shared_memory`, de modo que o processo
+    pai calcula centróides e top-k sem desserializar tensores grandes.
+
+Características:
+    - Resultados ordenados (cada shard escreve na sua faixa de linhas)
+    - Reinício do pool se um worker morrer, com reenvio dos shards pendentes
+    - CPU por padrão (CUDA_VISIBLE_DEVICES vazio nos workers)
+    - Implementa o protocolo Embedder: pode ser passado a semantic_compression
+
+Uso:
+    from functools import partial
+    pool = EmbeddingPool(partial(SentenceTransformerEmbedder, device="cpu"),
+                         model_id="all-MiniLM-L6-v2")
+    with pool:
+        compressed = semantic_compression(chunks, 0.5, embedder=pool)
+
+Requisitos:
+    pip install numpy
+"""
+
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tools.embedders import Embedder
+
+# ------------------------------------------------------------------------
+# 👷 Lado do Worker
+# ------------------------------------------------------------------------
+
+_WORKER_EMBEDDER: Optional[Embedder] = None
+
+
+def _init_worker(factory: Callable[[], Embedder], cpu_only: bool) -> None:
+    """Inicializa o worker: força CPU (opcional) e carrega o modelo uma vez."""
+    global _WORKER_EMBEDDER
+    if cpu_only:
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+    _WORKER_EMBEDDER = factory()
+
+
+def _probe_dim() -> int:
+    return int(_WORKER_EMBEDDER.encode(["dim"]).shape[1])
+
+
+def _encode_shard(shm_name: str, shape: Tuple[int, int], start: int, texts: Sequence[str]) -> int:
+    """Embedda um shard e grava as linhas [start, start + len) no array compartilhado."""
+    vectors = np.asarray(_WORKER_EMBEDDER.encode(list(texts)), dtype=np.float32)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        out[start:start + len(vectors)] = vectors
+        del out
+    finally:
+        shm.close()
+    return start
+
+
+# ------------------------------------------------------------------------
+# 🏭 Pool
+# ------------------------------------------------------------------------
+
+class EmbeddingPool:
+    """
+    Embedder multiprocesso com resultados em memória compartilhada.
+
+    Args:
+        embedder_factory (Callable): Função/classe picklável que cria o
+            Embedder dentro de cada worker (ex.: functools.partial).
+        processes (int): Número de workers (padrão: os.cpu_count()).
+        shard_size (int): Chunks por tarefa.
+        model_id (str): Identificador do modelo (para caches).
+        cpu_only (bool): Esconde GPUs dos workers.
+        max_restarts (int): Reinícios do pool tolerados por chamada.
+        start_method (str): Método de início dos processos ("spawn" é
+            o mais seguro para bibliotecas com threads, como torch).
+    """
+
+    def __init__(self, embedder_factory: Callable[[], Embedder], processes: Optional[int] = None,
+                 shard_size: int = 256, model_id: Optional[str] = None, cpu_only: bool = True,
+                 max_restarts: int = 2, start_method: str = "spawn"):
+        self.embedder_factory = embedder_factory
+        self.processes = processes or os.cpu_count() or 1
+        self.shard_size = shard_size
+        self.model_id = model_id or getattr(embedder_factory, "__name__", "embedding-pool")
+        self.cpu_only = cpu_only
+        self.max_restarts = max_restarts
+        self.restarts = 0
+        self._context = mp.get_context(start_method)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.dim: Optional[int] = None
+
+    def _start(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=self._context,
+                initializer=_init_worker,
+                initargs=(self.embedder_factory, self.cpu_only),
+            )
+        return self._executor
+
+    def _restart(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self.restarts += 1
+
+    def _recover(self, attempts: int) -> int:
+        """Reinicia o pool após uma falha; retorna as tentativas já usadas."""
+        if attempts >= self.max_restarts:
+            raise RuntimeError("Workers de embedding falharam repetidamente.")
+        self._restart()
+        return attempts + 1
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Embedda `texts` em paralelo; retorna (len(texts), dim) float32 na ordem de entrada."""
+        texts = list(texts)
+        attempts = 0
+        while self.dim is None:
+            try:
+                self.dim = self._start().submit(_probe_dim).result()
+            except BrokenProcessPool:  # worker morreu carregando o modelo
+                attempts = self._recover(attempts)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        shape = (len(texts), self.dim)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, shape[0] * shape[1] * 4))
+        try:
+            pending: Dict[int, Sequence[str]] = {
+                start: texts[start:start + self.shard_size]
+                for start in range(0, len(texts), self.shard_size)
+            }
+            while pending:
+                executor = self._start()
+                futures = {executor.submit(_encode_shard, shm.name, shape, start, shard): start
+                           for start, shard in pending.items()}
+                wait(futures)
+                broken = False
+                for future, start in futures.items():
+                    try:
+                        future.result()
+                        pending.pop(start, None)
+                    except BrokenProcessPool:
+                        broken = True
+                if broken:
+                    attempts = self._recover(attempts)
+
+            view = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+            result = view.copy()
+            del view
+            return result
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def close(self) -> None:
+        """Encerra os workers."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self) -> "EmbeddingPool":
+        self._start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ------------------------------------------------------------------------
+# 🧪 Teste Local
+# ------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from functools import partial
+
+    from tools.embedders import HashingEmbedder
+
+    chunks = [f"chunk {i} sobre densidade semântica e pressão contextual" for i in range(5_000)]
+    with EmbeddingPool(partial(HashingEmbedder, dim=384), model_id="hashing-384") as pool:
+        vectors = pool.encode(chunks)
+
+    reference = HashingEmbedder(dim=384).encode(chunks)
+    print("Shape:", vectors.shape, "| idêntico ao processo único:", np.array_equal(vectors, reference))
@@ -0,0 +1,153 @@
+"""
+tools/hybrid.py
+---------------
+
+Recuperação híbrida (lexical + densa) com fusão de rankings para o CEF.
+
+Objetivo:
+    Combinar o BM25 (termos exatos) com o índice vetorial (paráfrases)
+    para que o top-k pequeno já contenha os documentos certos — menos
+    candidatos recuperados e menos documentos rerankeados por consulta.
+
+Funcionamento:
+    1. As duas buscas rodam em paralelo (ThreadPoolExecutor; o produto
+       matricial do NumPy libera o GIL), cada uma limitada a
+       `candidates` documentos.
+    2. Fusão, por texto do documento:
+         rrf      – Σ 1 / (rrf_k + posição)          (padrão, rrf_k = 60)
+         weighted – w · lexical' + (1 − w) · denso'  (scores min-max
+                    normalizados por lista; ausente = 0)
+    3. O top-k fundido alimenta rerank_semantico / injetar_no_contexto.
+
+Uso:
+    retriever = HybridRetriever(BM25Index(corpus),
+                                DenseIndex.from_texts(corpus, embedder),
+                                embedder)
+    docs = retriever.retrieve(query, k=5)
+    context = injetar_no_contexto(context, rerank_semantico(query, docs))
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+from tools.bm25 import BM25Index
+from tools.embedders import Embedder
+from tools.segments import SegmentedIndex
+from tools.vector_index import DenseIndex
+
+FUSIONS = ("rrf", "weighted")
+
+# ------------------------------------------------------------------------
+# 🔀 Fusão de Rankings
+# ------------------------------------------------------------------------
+
+def reciprocal_rank_fusion(rankings: List[List[str]], rrf_k: int = 60) -> List[Tuple[str, float]]:
+    """Reciprocal Rank Fusion; empates mantêm a ordem da primeira aparição."""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for position, doc in enumerate(ranking, start=1):
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (rrf_k + position)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def weighted_fusion(results: List[List[Tuple[str, float]]], weights: List[float]) -> List[Tuple[str, float]]:
+    """Soma ponderada de scores min-max normalizados por lista."""
+    fused: Dict[str, float] = {}
+    for hits, weight in zip(results, weights):
+        if not hits:
+            continue
+        scores = [score for _, score in hits]
+        low, span = min(scores), max(scores) - min(scores)
+        for doc, score in hits:
+            norm = (score - low) / span if span > 0 else 1.0
+            fused[doc] = fused.get(doc, 0.0) + weight * norm
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+# ------------------------------------------------------------------------
+# 🧭 Recuperador Híbrido
+# ------------------------------------------------------------------------
+
+class HybridRetriever:
+    """
+    Consulta um índice lexical e um denso em paralelo e funde os rankings.
+
+    Args:
+        lexical (BM25Index | SegmentedIndex): Índice lexical.
+        dense (DenseIndex): Índice vetorial.
+        embedder (Embedder): Backend usado para construir `dense`.
+        fusion (str): "rrf" ou "weighted".
+        rrf_k (int): Constante de suavização do RRF.
+        lexical_weight (float): Peso do BM25 na fusão ponderada.
+        candidates (int): Máximo de candidatos por lista.
+    """
+
+    def __init__(self, lexical: Union[BM25Index, SegmentedIndex], dense: DenseIndex, embedder: Embedder,
+                 fusion: str = "rrf", rrf_k: int = 60, lexical_weight: float = 0.5,
+                 candidates: int = 50, executor: Optional[ThreadPoolExecutor] = None):
+        if fusion not in FUSIONS:
+            raise ValueError(f"Fusão desconhecida: {fusion}")
+        self.lexical = lexical
+        self.dense = dense
+        self.embedder = embedder
+        self.fusion = fusion
+        self.rrf_k = rrf_k
+        self.lexical_weight = lexical_weight
+        self.candidates = candidates
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=2, thread_name_prefix="cef-hybrid")
+
+    def _lexical(self, query: str, n: int) -> List[Tuple[str, float]]:
+        if isinstance(self.lexical, SegmentedIndex):
+            return self.lexical.search_documents(query, n)
+        return [(self.lexical.docs[doc_id], score) for doc_id, score in self.lexical.search(query, n)]
+
+    def _dense(self, query: str, n: int) -> List[Tuple[str, float]]:
+        return [(self.dense.docs[doc_id], score) for doc_id, score in self.dense.search_text(query, self.embedder, n)]
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Top-k fundido.
+
+        Returns:
+            List[Tuple[str, float]]: (documento, score de fusão) em ordem decrescente.
+        """
+        n = max(k, self.candidates)
+        lexical = self._executor.submit(self._lexical, query, n)
+        dense = self._executor.submit(self._dense, query, n)
+        results = [lexical.result(), dense.result()]
+
+        if self.fusion == "rrf":
+            fused = reciprocal_rank_fusion([[doc for doc, _ in hits] for hits in results], self.rrf_k)
+        else:
+            fused = weighted_fusion(results, [self.lexical_weight, 1.0 - self.lexical_weight])
+        return fused[:k]
+
+    def retrieve(self, query: str, k: int = 10) -> List[str]:
+        """Documentos do top-k fundido (entrada de rerank_semantico)."""
+        return [doc for doc, _ in self.search(query, k)]
+
+    def close(self) -> None:
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "HybridRetriever":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ------------------------------------------------------------------------
+# 🧪 Teste Local
+# ------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from tools.embedders import HashingEmbedder
+    from tools.rag_manager import MOCK_CORPUS, rerank_semantico
+
+    embedder = HashingEmbedder()
+    query = "Explique o papel da densidade semântica no raciocínio contextual."
+    with HybridRetriever(BM25Index(MOCK_CORPUS), DenseIndex.from_texts(MOCK_CORPUS, embedder), embedder) as retriever:
+        for doc, score in rerank_semantico(query, retriever.retrieve(query, k=3)):
+            print(f"{score:.2f}  {doc}")
@@ -0,0 +1,158 @@
+"""
+tools/quantization.py
+---------------------
+
+Armazenamento compacto de embeddings (float16 / int8) para o CEF.
+
+Objetivo:
+    Reduzir a memória por vetor em 2× (float16) ou ~4× (int8 com escala
+    por vetor) nos caches de compressão e nos índices de recuperação,
+    calculando similaridades sobre os dados quantizados (dequantização
+    em blocos) e medindo a perda contra float32.
+
+Formatos:
+    float32 – referência, sem perda
+    float16 – 2 bytes/dimensão
+    int8    – 1 byte/dimensão + 4 bytes de escala por vetor
+              (v ≈ q · escala, escala = máx|v| / 127)
+
+Requisitos:
+    pip install numpy
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+
+# ------------------------------------------------------------------------
+# 🔢 Quantização
+# ------------------------------------------------------------------------
+
+def quantize(vectors: np.ndarray, dtype: str = "float16") -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Quantiza uma matriz (n, d) de embeddings.
+
+    Returns:
+        Tuple[np.ndarray, Optional[np.ndarray]]: (dados, escalas por vetor
+        — apenas para int8).
+    """
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    if dtype == "float32":
+        return vectors, None
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        safe = np.where(scales > 0, scales, 1.0)
+        data = np.clip(np.rint(vectors / safe[:, None]), -127, 127).astype(np.int8)
+        return data, scales.astype(np.float32)
+    raise ValueError(f"dtype de quantização desconhecido: {dtype}")
+
+
+def dequantize(data: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """Reconstrói os vetores em float32."""
+    out = np.asarray(data, dtype=np.float32)
+    if scales is not None:
+        out = out * np.asarray(scales, dtype=np.float32)[..., None]
+    return out
+
+
+# ------------------------------------------------------------------------
+# 📦 Armazenamento Quantizado
+# ------------------------------------------------------------------------
+
+class QuantizedEmbeddings:
+    """
+    Matriz de embeddings quantizada com busca por similaridade em blocos.
+
+    Args:
+        vectors (np.ndarray): Matriz (n, d) original em float32.
+        dtype (str): "float32", "float16" ou "int8".
+        block_size (int): Linhas dequantizadas por vez nas buscas.
+    """
+
+    def __init__(self, vectors: np.ndarray, dtype: str = "float16", block_size: int = 65_536):
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        self.dtype = dtype
+        self.block_size = block_size
+        self.data, self.scales = quantize(vectors, dtype)
+        self.norms = np.linalg.norm(vectors, axis=1).astype(np.float32)
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelos dados quantizados (inclui escalas e normas)."""
+        extra = self.scales.nbytes if self.scales is not None else 0
+        return self.data.nbytes + extra + self.norms.nbytes
+
+    def dequantize(self, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """Vetores [start, end) em float32."""
+        scales = self.scales[start:end] if self.scales is not None else None
+        return dequantize(self.data[start:end], scales)
+
+    def dot(self, query: np.ndarray) -> np.ndarray:
+        """Produto interno de `query` com todos os vetores, em blocos."""
+        query = np.asarray(query, dtype=np.float32)
+        out = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), self.block_size):
+            end = start + self.block_size
+            scores = self.data[start:end].astype(np.float32) @ query
+            if self.scales is not None:
+                scores *= self.scales[start:end]
+            out[start:end] = scores
+        return out
+
+    def cosine(self, query: np.ndarray) -> np.ndarray:
+        """Similaridade de cosseno de `query` com todos os vetores."""
+        query = np.asarray(query, dtype=np.float32)
+        denom = np.maximum(self.norms * np.linalg.norm(query), 1e-12)
+        return self.dot(query) / denom
+
+    def search(self, query: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Top-k por cosseno: (índices, scores) em ordem decrescente."""
+        scores = self.cosine(query)
+        k = min(k, len(scores))
+        if k == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((top, -scores[top]))]
+        return top, scores[top]
+
+    def evaluate(self, reference: np.ndarray, queries: np.ndarray, k: int = 10) -> Dict[str, float]:
+        """
+        Mede a perda da quantização contra a matriz float32 original.
+
+        Returns:
+            Dict[str, float]: recall@k, erro absoluto médio dos cossenos
+            e razão de compressão de memória.
+        """
+        exact = QuantizedEmbeddings(reference, "float32", self.block_size)
+        recalls, errors = [], []
+        for query in np.atleast_2d(queries):
+            truth, _ = exact.search(query, k)
+            found, _ = self.search(query, k)
+            recalls.append(len(set(truth.tolist()) & set(found.tolist())) / max(len(truth), 1))
+            errors.append(float(np.mean(np.abs(exact.cosine(query) - self.cosine(query)))))
+        return {
+            f"recall@{k}": float(np.mean(recalls)),
+            "mean_abs_error": float(np.mean(errors)),
+            "compression": exact.nbytes / self.nbytes,
+        }
+
+
+# ------------------------------------------------------------------------
+# 🧪 Teste Local
+# ------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=(20_000, 384)).astype(np.float32)
+    queries = base[rng.choice(len(base), 50)] + 0.1 * rng.normal(size=(50, 384)).astype(np.float32)
+
+    for dtype in ("float16", "int8"):
+        report = QuantizedEmbeddings(base, dtype).evaluate(base, queries, k=10)
+        print(dtype, report)
@@ -0,0 +1,185 @@
+"""
+tools/rag_async.py
+------------------
+
+Pipeline RAG assíncrono com recuperação concorrente em várias fontes (CEF).
+
+Objetivo:
+    Agentes consultam de 3 a 6 bases de conhecimento por turno; em série,
+    as latências se somam. Aqui todas as fontes são consultadas ao mesmo
+    tempo, cada uma com seu timeout, e o reranking de uma fonte começa
+    assim que ela responde.
+
+Fontes aceitas:
+    List[str]                   – corpus (BM25 via recuperar_documentos)
+    BM25Index / SegmentedIndex /
+    ShardedRetriever            – índice lexical já construído
+    objeto com .retrieve(q, k)  – ex.: HybridRetriever
+    callable(q) / async callable(q) → List[str]
+
+Funcionamento:
+    1. Uma task por fonte, limitada por asyncio.wait_for; fontes que
+       estouram o timeout são abandonadas e listadas em context["rag_timeouts"];
+       fontes que falham (exceção) são ignoradas e registradas em
+       context["rag_errors"] ({posição: "Tipo: mensagem"}).
+       Fontes assíncronas são canceladas; fontes síncronas não podem ser
+       interrompidas e seguem até o fim numa thread do executor de
+       fontes (limitado a SOURCE_WORKERS threads, separado do executor de
+       reranking): uma fonte travada não bloqueia o reranking.
+    2. asyncio.as_completed: cada resposta é rerankeada num executor
+       (thread por padrão) enquanto as demais fontes ainda respondem.
+    3. Os rankings parciais são unidos (duplicatas exatas ficam com a
+       fonte de menor índice) e passam por injetar_no_contexto.
+
+Uso:
+    context = await retrieve_and_inject(context, query,
+                                        sources=[corpus_a, index_b, hybrid],
+                                        timeout=0.5)
+"""
+
+import asyncio
+import inspect
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from tools.bm25 import BM25Index
+from tools.document_store import DocumentStore
+from tools.rag_manager import injetar_no_contexto, recuperar_documentos, rerank_semantico
+from tools.segments import SegmentedIndex
+from tools.sharding import ShardedRetriever
+
+SOURCE_WORKERS = 16
+
+_source_executor: Optional[ThreadPoolExecutor] = None
+_source_executor_lock = threading.Lock()
+
+# ------------------------------------------------------------------------
+# 📡 Consulta a uma Fonte
+# ------------------------------------------------------------------------
+
+def _default_source_executor() -> ThreadPoolExecutor:
+    """Executor compartilhado (criado sob demanda) das fontes síncronas."""
+    global _source_executor
+    with _source_executor_lock:
+        if _source_executor is None:
+            _source_executor = ThreadPoolExecutor(SOURCE_WORKERS, thread_name_prefix="cef-rag-source")
+        return _source_executor
+
+
+async def _fetch(source: Any, query: str, k: int, executor: Executor) -> List[str]:
+    loop = asyncio.get_running_loop()
+    if isinstance(source, list):
+        return await loop.run_in_executor(executor, recuperar_documentos, query, source, k)
+    if isinstance(source, (BM25Index, SegmentedIndex, ShardedRetriever)):
+        return await loop.run_in_executor(executor, lambda: recuperar_documentos(query, k=k, index=source))
+    if hasattr(source, "retrieve"):
+        return await loop.run_in_executor(executor, source.retrieve, query, k)
+    if inspect.iscoroutinefunction(source) or inspect.iscoroutinefunction(getattr(source, "__call__", None)):
+        return list(await source(query))[:k]
+    return list(await loop.run_in_executor(executor, source, query))[:k]
+
+
+async def _timed(position: int, source: Any, query: str, k: int, timeout: Optional[float],
+                 executor: Executor) -> Tuple[int, Optional[List[str]], Optional[BaseException]]:
+    """(posição, documentos, erro); timeout e falhas da fonte não propagam."""
+    try:
+        return position, await asyncio.wait_for(_fetch(source, query, k, executor), timeout), None
+    except Exception as error:  # inclui asyncio.TimeoutError
+        return position, None, error
+
+
+# ------------------------------------------------------------------------
+# 🧠 Recuperação + Injeção
+# ------------------------------------------------------------------------
+
+async def retrieve_and_inject(context: Dict, query: str, sources: Sequence[Any],
+                              timeout: Union[None, float, Sequence[Optional[float]]] = 2.0,
+                              k: int = 3, limite: int = 2, store: Optional[DocumentStore] = None,
+                              executor: Optional[Executor] = None,
+                              source_executor: Optional[Executor] = None) -> Dict:
+    """
+    Consulta as fontes concorrentemente, rerankeia e injeta no contexto.
+
+    Args:
+        context (Dict): Dicionário de contexto ativo do agente.
+        query (str): Consulta textual.
+        sources (Sequence): Fontes de documentos (ver docstring do módulo).
+        timeout (float | Sequence[float]): Timeout em segundos, global ou
+            por fonte (None = sem limite). Uma sequência deve ter um valor
+            por fonte.
+        k (int): Documentos recuperados por fonte.
+        limite (int): Número máximo de documentos a injetar.
+        store (DocumentStore): SD/termos pré-calculados (reranking vetorizado).
+        executor (Executor): Executor do reranking e da injeção
+            (None = executor padrão do loop).
+        source_executor (Executor): Executor das fontes síncronas (None =
+            executor compartilhado de SOURCE_WORKERS threads). Fontes que
+            estouram o timeout continuam ocupando sua thread até terminar.
+
+    Returns:
+        Dict: Contexto atualizado (rag, rag_sd, rag_timeouts, rag_errors).
+    """
+    loop = asyncio.get_running_loop()
+    if timeout is None or isinstance(timeout, (int, float)):
+        timeouts = [timeout] * len(sources)
+    else:
+        timeouts = list(timeout)
+        if len(timeouts) != len(sources):
+            raise ValueError(f"{len(timeouts)} timeouts para {len(sources)} fontes.")
+
+    source_executor = source_executor or _default_source_executor()
+    tasks = [asyncio.ensure_future(_timed(i, source, query, k, t, source_executor))
+             for i, (source, t) in enumerate(zip(sources, timeouts))]
+    reranks: List[Tuple[int, "asyncio.Future"]] = []
+    timed_out: List[int] = []
+    errors: Dict[int, str] = {}
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            position, docs, error = await next_done
+            if isinstance(error, asyncio.TimeoutError):
+                timed_out.append(position)
+            elif error is not None:
+                errors[position] = f"{type(error).__name__}: {error}"
+            elif docs:
+                reranks.append((position, loop.run_in_executor(executor, rerank_semantico, query, docs, None, store)))
+        ranked = [(position, await future) for position, future in reranks]
+    finally:
+        for task in tasks:
+            task.cancel()
+        for _, future in reranks:
+            future.cancel()
+
+    merged: Dict[str, Tuple[float, int, int]] = {}
+    for position, hits in ranked:
+        for rank, (doc, score) in enumerate(hits):
+            key = (-score, position, rank)
+            if doc not in merged or key[1:] < merged[doc][1:]:
+                merged[doc] = key
+    top_docs = [(doc, -key[0]) for doc, key in sorted(merged.items(), key=lambda item: item[1])]
+
+    context = await loop.run_in_executor(executor, injetar_no_contexto, context, top_docs, limite, store)
+    context["rag_timeouts"] = sorted(timed_out)
+    context["rag_errors"] = dict(sorted(errors.items()))
+    return context
+
+
+# ------------------------------------------------------------------------
+# 🧪 Teste Local
+# ------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from tools.rag_manager import MOCK_CORPUS
+
+    async def fonte_lenta(query: str) -> List[str]:
+        await asyncio.sleep(5)
+        return ["nunca chega"]
+
+    async def main() -> None:
+        query = "Explique o papel da densidade semântica no raciocínio contextual."
+        context = {"system": "Agente de análise contextual", "tokens": query.split()}
+        sources = [MOCK_CORPUS, BM25Index(MOCK_CORPUS[::-1]), fonte_lenta]
+        context = await retrieve_and_inject(context, query, sources, timeout=0.2)
+        print(context)
+
+    asyncio.run(main())
@@ -7,6 +7,8 @@ Context Engineering Framework (CEF).
 
 Funções principais:
     - recuperar_documentos(query)
+    - recuperar_documentos_densos(query, index, embedder)
+    - recuperar_documentos_hibridos(query, retriever)
     - calcular_relevancia_semantica(query, doc)
     - rerank_semantico(query, docs)
     - injetar_no_contexto(context, top_docs)
@@ -17,9 +19,20 @@ Objetivo:
     minimalismo e saturação contextual.
 """
 
-from typing import List, Dict, Tuple
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple, Union
 import numpy as np
-from core.context_metrics import calculate_sd
+from core.context_metrics import calculate_sd, get_metrics_mode
+from tools.bm25 import BM25Index
+from tools.dedup import NearDuplicateFilter
+from tools.document_store import DocumentStore
+from tools.embedders import Embedder
+from tools.hybrid import HybridRetriever
+from tools.retrieval_cache import RetrievalCache, normalize_lexical, normalize_rerank
+from tools.segments import SegmentedIndex
+from tools.sharding import ShardedRetriever
+from tools.vector_index import DenseIndex
 
 # Se disponível, pode ser substituído por um cliente real (FAISS, Pinecone, etc.)
 MOCK_CORPUS = [
@@ -30,33 +43,102 @@ MOCK_CORPUS = [
     "O modo de saturação enfatiza redundância simbólica e plasticidade narrativa."
 ]
 
+# Índices BM25 construídos sob demanda para corpora passados como lista.
+# A entrada guarda a própria lista (o id não é reutilizado enquanto ela
+# vive) e é validada em O(1): mesma lista e mesmo tamanho. Listas que só
+# crescem (append/extend) têm os novos documentos indexados numa cópia
+# do índice, trocada sob _INDEX_LOCK (consultas em andamento seguem no
+# índice antigo); edições no lugar exigem uma nova lista ou um índice
+# explícito (`index=`).
+_INDEX_CACHE: "OrderedDict[int, Tuple[List[str], BM25Index]]" = OrderedDict()
+_INDEX_CACHE_SIZE = 8
+_INDEX_LOCK = threading.Lock()
+
 # ------------------------------------------------------------------------
-# 🔍 Recuperação Simulada
+# 🔍 Recuperação Lexical (BM25)
 # ------------------------------------------------------------------------
 
-def recuperar_documentos(query: str, corpus: List[str] = MOCK_CORPUS) -> List[str]:
+def _index_for(corpus: List[str]) -> BM25Index:
+    """Retorna (ou constrói) o índice BM25 de um corpus em lista."""
+    with _INDEX_LOCK:
+        entry = _INDEX_CACHE.get(id(corpus))
+        if entry is None or entry[0] is not corpus or len(entry[1]) > len(corpus):
+            entry = (corpus, BM25Index(corpus))
+        elif len(entry[1]) < len(corpus):
+            entry = (corpus, entry[1].with_documents(corpus[len(entry[1]):]))
+        _INDEX_CACHE[id(corpus)] = entry
+        _INDEX_CACHE.move_to_end(id(corpus))
+        while len(_INDEX_CACHE) > _INDEX_CACHE_SIZE:
+            _INDEX_CACHE.popitem(last=False)
+        return entry[1]
+
+
+def recuperar_documentos(query: str, corpus: List[str] = MOCK_CORPUS, k: int = 3,
+                         index: Optional[Union[BM25Index, SegmentedIndex, ShardedRetriever]] = None,
+                         cache: Optional[RetrievalCache] = None) -> List[str]:
     """
-    Recupera documentos do corpus com base em similaridade vetorial simples.
-    (placeholder para integração com FAISS, Pinecone ou LlamaIndex)
+    Recupera documentos do corpus por BM25 sobre um índice invertido.
+    (FAISS, Pinecone ou LlamaIndex podem ser integrados no lugar do índice)
 
     Args:
         query (str): Consulta textual do agente.
-        corpus (List[str]): Base textual de conhecimento.
+        corpus (List[str]): Base textual de conhecimento (indexada e
+            mantida em cache na primeira consulta; novos documentos
+            adicionados ao final são indexados, mas edições no lugar
+            exigem uma nova lista ou `index=`).
+        k (int): Número máximo de documentos.
+        index (BM25Index | SegmentedIndex | ShardedRetriever): Índice já
+            construído (ignora `corpus`); um SegmentedIndex aceita ingestão
+            incremental e um ShardedRetriever distribui o corpus entre processos.
+        cache (RetrievalCache): Cache de resultados (invalidado quando o
+            corpus/índice muda; resultados com shards ausentes não são
+            armazenados).
 
     Returns:
         List[str]: Documentos mais relevantes (não rerankeados ainda).
     """
-    query_vec = np.array([hash(w) % 1000 for w in query.split() if w.isalpha()])
-    docs = []
+    if cache is not None:
+        source = index if index is not None else _index_for(corpus)
+        key = ("bm25", normalize_lexical(query), k)
+        compute = lambda: tuple(recuperar_documentos(query, corpus, k, source))
+        complete = lambda: not getattr(source, "last_missing", None)  # shards ausentes: resultado parcial
+        return list(cache.get_or_compute(key, compute, source, complete))
+    if isinstance(index, (SegmentedIndex, ShardedRetriever)):
+        return [doc for doc, _ in index.search_documents(query, k)]
+    index = index or _index_for(corpus)
+    return [index.docs[doc_id] for doc_id, _ in index.search(query, k)]
+
+
+def recuperar_documentos_densos(query: str, index: DenseIndex, embedder: Embedder,
+                                k: int = 3) -> List[str]:
+    """
+    Recupera documentos por similaridade vetorial (DenseIndex flat ou IVF).
+
+    Args:
+        query (str): Consulta textual do agente.
+        index (DenseIndex): Índice denso (ex.: DenseIndex.load(dir) com mmap).
+        embedder (Embedder): Mesmo backend usado para construir o índice.
+        k (int): Número máximo de documentos.
+
+    Returns:
+        List[str]: Documentos mais similares (não rerankeados ainda).
+    """
+    return [index.docs[doc_id] for doc_id, _ in index.search_text(query, embedder, k)]
 
-    for doc in corpus:
-        doc_vec = np.array([hash(w) % 1000 for w in doc.split() if w.isalpha()])
-        sim = np.dot(query_vec.mean(), doc_vec.mean()) / (np.linalg.norm(query_vec.mean()) + 1e-6)
-        docs.append((doc, sim))
 
-    # Ordena pela relevância descendente
-    docs.sort(key=lambda x: x[1], reverse=True)
-    return [d[0] for d in docs[:3]]
+def recuperar_documentos_hibridos(query: str, retriever: HybridRetriever, k: int = 3) -> List[str]:
+    """
+    Recupera documentos fundindo BM25 e busca densa (RRF ou ponderada).
+
+    Args:
+        query (str): Consulta textual do agente.
+        retriever (HybridRetriever): Par de índices lexical + denso.
+        k (int): Número máximo de documentos.
+
+    Returns:
+        List[str]: Documentos do top-k fundido (não rerankeados ainda).
+    """
+    return retriever.retrieve(query, k)
 
 
 # ------------------------------------------------------------------------
@@ -84,27 +166,51 @@ def calcular_relevancia_semantica(query: str, doc: str) -> float:
 # 🧩 Reranking Semântico
 # ------------------------------------------------------------------------
 
-def rerank_semantico(query: str, docs: List[str]) -> List[Tuple[str, float]]:
+def rerank_semantico(query: str, docs: List[str],
+                     dedup: Optional[NearDuplicateFilter] = None,
+                     store: Optional[DocumentStore] = None,
+                     k: Optional[int] = None,
+                     cache: Optional[RetrievalCache] = None) -> List[Tuple[str, float]]:
     """
     Reordena documentos com base em relevância semântica ponderada por SD.
 
     Args:
         query (str): Texto de consulta.
         docs (List[str]): Documentos recuperados.
+        dedup (NearDuplicateFilter): Se fornecido, quase-duplicatas são
+            colapsadas (mantém a primeira ocorrência) antes do scoring.
+        store (DocumentStore): Se fornecido, SD e termos de cada documento
+            vêm pré-calculados (documentos novos são ingeridos) e o lote
+            inteiro é pontuado de forma vetorizada.
+        k (int): Retorna apenas os k melhores (None = todos).
+        cache (RetrievalCache): Cache de resultados por consulta
+            normalizada + candidatos + parâmetros.
 
     Returns:
         List[Tuple[str, float]]: Lista ordenada de (documento, score)
     """
+    if cache is not None:
+        params = (None if dedup is None else (dedup.threshold, dedup.num_perm, dedup.shingle_size, dedup.seed),
+                  k, get_metrics_mode())
+        key = ("rerank", normalize_rerank(query), tuple(docs), params)
+        compute = lambda: tuple(rerank_semantico(query, docs, dedup, store, k))
+        return list(cache.get_or_compute(key, compute))
+    if dedup is not None:
+        docs, _ = dedup.collapse(docs)
+    if store is not None:
+        top, scores = store.top_k(query, store.ids(docs), len(docs) if k is None else k)
+        return [(docs[i], score) for i, score in zip(top.tolist(), scores.tolist())]
     scored = [(doc, calcular_relevancia_semantica(query, doc)) for doc in docs]
     reranked = sorted(scored, key=lambda x: x[1], reverse=True)
-    return reranked
+    return reranked if k is None else reranked[:k]
 
 
 # ------------------------------------------------------------------------
 # 🧠 Injeção no Contexto
 # ------------------------------------------------------------------------
 
-def injetar_no_contexto(context: Dict, top_docs: List[Tuple[str, float]], limite: int = 2) -> Dict:
+def injetar_no_contexto(context: Dict, top_docs: List[Tuple[str, float]], limite: int = 2,
+                        store: Optional[DocumentStore] = None) -> Dict:
     """
     Injeta os documentos mais relevantes no contexto ativo.
 
@@ -112,13 +218,15 @@ def injetar_no_contexto(context: Dict, top_docs: List[Tuple[str, float]], limite
         context (Dict): Dicionário de contexto ativo do agente.
         top_docs (List[Tuple[str, float]]): Documentos rerankeados.
         limite (int): Número máximo de documentos a injetar.
+        store (DocumentStore): Se fornecido, a SD vem pré-calculada.
 
     Returns:
         Dict: Contexto atualizado com novos elementos RAG.
     """
     relevantes = [doc for doc, score in top_docs[:limite] if score >= 0.7]
+    sd = store.sd_of if store is not None else calculate_sd
     context["rag"] = relevantes
-    context["rag_sd"] = np.mean([calculate_sd(d) for d in relevantes]) if relevantes else 0.0
+    context["rag_sd"] = np.mean([sd(d) for d in relevantes]) if relevantes else 0.0
     return context
 
 
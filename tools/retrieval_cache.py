@@ -0,0 +1,258 @@
+"""
+tools/retrieval_cache.py
+------------------------
+
+Cache de resultados de recuperação e reranking para o RAG do CEF.
+
+Objetivo:
+    Agentes repetem consultas idênticas (ou idênticas após normalização)
+    dentro e entre sessões. O cache devolve o resultado anterior em
+    microssegundos em vez de refazer a recuperação.
+
+Chave:
+    (operação, consulta normalizada, versão do corpus, parâmetros)
+    - recuperação: multiconjunto de tokens de tokenize(query) — o BM25
+      ignora ordem, caixa e pontuação, então consultas que diferem só
+      nisso compartilham a entrada
+    - reranking: conjunto de termos de query.lower().split() + número
+      de palavras (exatamente o que calcular_relevancia_semantica usa)
+
+Invalidação:
+    - LRU limitado por número de entradas + TTL por entrada
+    - versão do corpus: (identidade, `version`) do índice, lida em O(1).
+      A identidade é um número nunca reutilizado (não o id(), que o
+      CPython recicla após a coleta) e `version` vem de um contador do
+      processo (BM25Index, SegmentedIndex, ShardedRetriever); corpora em
+      lista são versionados pelo BM25Index que recuperar_documentos
+      mantém para eles. Ao ver uma versão nova de um corpus, as entradas
+      antigas são descartadas; quando o corpus é coletado, também
+
+Uso:
+    cache = RetrievalCache(maxsize=4096, ttl=600)
+    docs = recuperar_documentos(query, index=segmented, cache=cache)
+    reranked = rerank_semantico(query, docs, cache=cache)
+    print(cache.info())
+"""
+
+import itertools
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from core.context_metrics import tokenize
+
+# ------------------------------------------------------------------------
+# 🔑 Normalização e Versões
+# ------------------------------------------------------------------------
+
+def normalize_lexical(query: str) -> Tuple[Tuple[str, int], ...]:
+    """Consulta como o BM25 a enxerga: multiconjunto de tokens."""
+    return tuple(sorted(Counter(tokenize(query)).items()))
+
+
+def normalize_rerank(query: str) -> Tuple[frozenset, int]:
+    """Consulta como calcular_relevancia_semantica a enxerga."""
+    return frozenset(query.lower().split()), len(query.split())
+
+
+_UIDS: "weakref.WeakKeyDictionary[Any, int]" = weakref.WeakKeyDictionary()
+_NEXT_UID = itertools.count(1)
+_UIDS_LOCK = threading.Lock()
+
+
+def corpus_uid(corpus: Any) -> int:
+    """Identidade de um índice que nunca é reutilizada por outro objeto."""
+    with _UIDS_LOCK:
+        uid = _UIDS.get(corpus)
+        if uid is None:
+            uid = _UIDS[corpus] = next(_NEXT_UID)
+        return uid
+
+
+def corpus_version(corpus: Any) -> Tuple[int, Hashable]:
+    """
+    (identidade, versão) de um índice, em O(1): muda sempre que o
+    conteúdo muda. Usa o atributo `version` (BM25Index, SegmentedIndex,
+    ShardedRetriever) ou, na falta dele, o número de documentos (índices
+    append-only). Listas não são aceitas: verificar seu conteúdo custaria
+    O(N) por consulta — indexe-as (ou use recuperar_documentos, que já o faz).
+    """
+    if isinstance(corpus, list):
+        raise TypeError("Corpus em lista não tem versão; passe o índice construído sobre ele.")
+    version = getattr(corpus, "version", None)
+    return corpus_uid(corpus), version if version is not None else len(corpus)
+
+
+def _deep_size(value: Any) -> int:
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(_deep_size(k) + _deep_size(v) for k, v in value.items())
+    return size
+
+
+# ------------------------------------------------------------------------
+# 🗄️ Cache
+# ------------------------------------------------------------------------
+
+class RetrievalCache:
+    """
+    Cache LRU + TTL de resultados de recuperação, seguro entre threads.
+
+    Args:
+        maxsize (int): Máximo de entradas.
+        ttl (float): Validade de cada entrada em segundos (None = sem TTL).
+        clock (Callable): Relógio monotônico (substituível em testes).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        if maxsize <= 0:
+            raise ValueError("maxsize deve ser positivo.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        # chave → (expira_em, valor, bytes estimados, id do corpus)
+        self._data: "OrderedDict[Hashable, Tuple[Optional[float], Any, int, Optional[int]]]" = OrderedDict()
+        self._versions: Dict[int, Hashable] = {}
+        self._by_corpus: Dict[int, Set[Hashable]] = {}
+        self._watched: Set[int] = set()
+        self._gone: List[int] = []  # preenchida por weakref.finalize (sem lock)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], corpus: Any = None,
+                       complete: Optional[Callable[[], bool]] = None) -> Any:
+        """
+        Retorna o valor em cache ou calcula (fora do lock) e armazena.
+
+        Args:
+            key (Hashable): Operação + consulta normalizada + parâmetros.
+            compute (Callable): Produz o valor (deve ser imutável, ex.: tupla).
+            corpus (Any): Índice consultado — sua corpus_version() entra na
+                chave e dispara a invalidação das versões anteriores; as
+                entradas são descartadas quando o índice é coletado.
+            complete (Callable): Consultado após compute(); se retornar
+                False o valor é parcial (ex.: shards ausentes) e não é
+                armazenado.
+        """
+        version = corpus_version(corpus) if corpus is not None else None
+        corpus_id = version[0] if version is not None else None
+        if version is not None:
+            key = (key, version)
+        now = self._clock()
+        with self._lock:
+            self._collect_gone()
+            if version is not None:
+                if corpus_id not in self._watched:
+                    self._watched.add(corpus_id)
+                    weakref.finalize(corpus, self._gone.append, corpus_id)
+                if self._versions.get(corpus_id, version[1]) != version[1]:
+                    self._purge_corpus(corpus_id)
+            entry = self._data.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > now):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+
+        value = compute()
+        if complete is not None and not complete():
+            return value
+
+        with self._lock:
+            if version is not None:
+                if self._versions.setdefault(corpus_id, version[1]) != version[1]:
+                    return value  # o corpus mudou durante o cálculo
+                self._by_corpus.setdefault(corpus_id, set()).add(key)
+            if key in self._data:
+                self._drop(key)
+            expires = now + self.ttl if self.ttl is not None else None
+            size = _deep_size(value)
+            self._data[key] = (expires, value, size, corpus_id)
+            self._bytes += size
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+        return value
+
+    def _drop(self, key: Hashable) -> None:
+        _, _, size, corpus_id = self._data.pop(key)
+        self._bytes -= size
+        if corpus_id is not None:
+            self._by_corpus.get(corpus_id, set()).discard(key)
+
+    def _purge_corpus(self, corpus_id: int) -> None:
+        for key in list(self._by_corpus.pop(corpus_id, ())):
+            if key in self._data:
+                self._drop(key)
+        self._versions.pop(corpus_id, None)
+        self.invalidations += 1
+
+    def _collect_gone(self) -> None:
+        """Esquece os corpora já coletados (chamar com o lock)."""
+        while self._gone:
+            corpus_id = self._gone.pop()
+            for key in list(self._by_corpus.pop(corpus_id, ())):
+                if key in self._data:
+                    self._drop(key)
+            self._versions.pop(corpus_id, None)
+            self._watched.discard(corpus_id)
+
+    def clear(self) -> None:
+        """Esvazia o cache e zera os contadores."""
+        with self._lock:
+            self._data.clear()
+            self._versions.clear()
+            self._by_corpus.clear()
+            self._gone.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.invalidations = 0
+
+    def info(self) -> Dict[str, float]:
+        """Acertos, erros, taxa de acerto, entradas e memória estimada (bytes)."""
+        with self._lock:
+            self._collect_gone()
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "entries": len(self._data),
+                "invalidations": self.invalidations,
+                "memory_bytes": self._bytes,
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._collect_gone()
+            return len(self._data)
+
+
+# ------------------------------------------------------------------------
+# 🧪 Teste Local
+# ------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from tools.rag_manager import recuperar_documentos
+    from tools.segments import SegmentedIndex
+
+    cache = RetrievalCache(maxsize=128, ttl=60)
+    index = SegmentedIndex([
+        "A densidade semântica é a métrica que mede coerência interna de um texto.",
+        "O modo minimalista favorece precisão e inferência determinística.",
+    ], background_merge=False)
+
+    recuperar_documentos("Densidade semântica?", index=index, cache=cache)
+    recuperar_documentos("semântica, densidade", index=index, cache=cache)  # mesma chave
+    index.add_documents(["Densidade semântica alta reduz ruído."])
+    print(recuperar_documentos("densidade semântica", index=index, cache=cache))
+    print(cache.info())
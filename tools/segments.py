@@ -0,0 +1,383 @@
+"""
+tools/segments.py
+-----------------
+
+Ingestão incremental do corpus RAG em segmentos imutáveis (CEF).
+
+Objetivo:
+    Permitir que a base de conhecimento mude o dia inteiro sem
+    reconstruir o índice: cada lote ingerido vira um novo segmento BM25
+    imutável, remoções viram tombstones e uma política de merge em
+    segundo plano compacta os segmentos.
+
+Funcionamento:
+    - add_documents(docs)      → novo segmento; retorna ids globais
+    - delete_documents(ids)    → tombstones (o segmento é substituído por
+                                 uma cópia com o novo conjunto removido)
+    - update_document(id, doc) → remoção + inserção; retorna o novo id
+    - Busca sobre um snapshot (tupla de segmentos lida atomicamente):
+      mutações concorrentes nunca são vistas pela metade
+    - Estatísticas de coleção (N, avgdl, df) calculadas sobre os
+      documentos vivos do snapshot: scores idênticos aos de um
+      BM25Index reconstruído do zero
+    - Merge por camadas: acima de `max_segments` os `merge_factor`
+      menores segmentos são fundidos; segmentos com fração de
+      tombstones ≥ `max_deleted_ratio` são reescritos sem eles
+    - `version` cresce a cada mutação visível e é única no processo
+      (contador compartilhado com BM25Index; útil para caches)
+"""
+
+import heapq
+import threading
+import weakref
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from core.context_metrics import tokenize
+from tools.bm25 import _VERSIONS, BM25Index
+
+# ------------------------------------------------------------------------
+# 🧱 Segmento Imutável
+# ------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Segment:
+    """Índice BM25 imutável + ids globais + tombstones (ids locais)."""
+
+    uid: int
+    index: BM25Index
+    ids: Tuple[int, ...]
+    deleted: FrozenSet[int] = field(default_factory=frozenset)
+    deleted_len: int = 0
+
+    @property
+    def live(self) -> int:
+        return len(self.ids) - len(self.deleted)
+
+    @property
+    def live_len(self) -> int:
+        return self.index.total_len - self.deleted_len
+
+    def df(self, term: str) -> int:
+        postings = self.index.postings.get(term)
+        if not postings:
+            return 0
+        if not self.deleted:
+            return len(postings)
+        return len(postings) - sum(1 for d in self.deleted if d in postings)
+
+
+class _Wakeup:
+    """Sinal entre o índice e a thread de merge (não referencia o índice)."""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.pending = False
+        self.closed = False
+
+    def notify(self, close: bool = False) -> None:
+        with self.condition:
+            self.pending = True
+            self.closed = self.closed or close
+            self.condition.notify()
+
+
+def _merge_loop(ref: "weakref.ref[SegmentedIndex]", wakeup: _Wakeup) -> None:
+    """Merges em segundo plano; termina no close() ou quando o índice é coletado."""
+    while True:
+        with wakeup.condition:
+            wakeup.condition.wait_for(lambda: wakeup.pending or wakeup.closed)
+            if wakeup.closed:
+                return
+            wakeup.pending = False
+        index = ref()
+        if index is None:
+            return
+        index.merge()
+        del index
+
+
+# ------------------------------------------------------------------------
+# 📚 Índice Segmentado
+# ------------------------------------------------------------------------
+
+class SegmentedIndex:
+    """
+    Índice BM25 incremental composto por segmentos imutáveis.
+
+    Args:
+        documents (Iterable[str]): Documentos iniciais (primeiro segmento).
+        k1 (float): Saturação da frequência do termo.
+        b (float): Normalização pelo tamanho do documento.
+        max_segments (int): Segmentos tolerados antes de um merge.
+        merge_factor (int): Segmentos fundidos por merge.
+        max_deleted_ratio (float): Fração de tombstones que força a
+            reescrita de um segmento.
+        background_merge (bool): Compacta numa thread em segundo plano
+            (False = apenas via merge() explícito). A thread guarda só uma
+            referência fraca ao índice e termina com close(), ao sair do
+            bloco `with` ou quando o índice é coletado.
+    """
+
+    def __init__(self, documents: Iterable[str] = (), k1: float = 1.5, b: float = 0.75,
+                 max_segments: int = 8, merge_factor: int = 4, max_deleted_ratio: float = 0.3,
+                 background_merge: bool = True):
+        self.k1 = k1
+        self.b = b
+        self.max_segments = max_segments
+        self.merge_factor = max(2, merge_factor)
+        self.max_deleted_ratio = max_deleted_ratio
+        self.version = next(_VERSIONS)
+
+        self._segments: Tuple[Segment, ...] = ()
+        self._where: Dict[int, Tuple[int, int]] = {}  # id global → (uid, id local)
+        self._next_id = 0
+        self._next_uid = 0
+        self._lock = threading.Lock()
+        self._merge_lock = threading.Lock()
+        self._wakeup = _Wakeup()
+        self._thread: Optional[threading.Thread] = None
+        if background_merge:
+            weakref.finalize(self, self._wakeup.notify, True)
+            self._thread = threading.Thread(target=_merge_loop, args=(weakref.ref(self), self._wakeup),
+                                            name="cef-segment-merge", daemon=True)
+            self._thread.start()
+
+        documents = list(documents)
+        if documents:
+            self.add_documents(documents)
+
+    def __len__(self) -> int:
+        return sum(seg.live for seg in self._segments)
+
+    @property
+    def segments(self) -> Tuple[Segment, ...]:
+        """Snapshot atual (imutável) dos segmentos."""
+        return self._segments
+
+    # --------------------------------------------------------------------
+    # ✍️ Ingestão
+    # --------------------------------------------------------------------
+
+    def add_documents(self, documents: Iterable[str]) -> List[int]:
+        """Indexa os documentos num novo segmento e retorna seus ids globais."""
+        documents = list(documents)
+        if not documents:
+            return []
+        index = BM25Index(documents, k1=self.k1, b=self.b)
+        with self._lock:
+            ids = self._append_segment(index)
+            self.version = next(_VERSIONS)
+        self._signal()
+        return ids
+
+    def delete_documents(self, doc_ids: Iterable[int]) -> int:
+        """Marca documentos como removidos; retorna quantos existiam."""
+        with self._lock:
+            removed = self._tombstone(doc_ids)
+            if removed:
+                self.version = next(_VERSIONS)
+        if removed:
+            self._signal()
+        return removed
+
+    def update_document(self, doc_id: int, document: str) -> int:
+        """
+        Substitui um documento e retorna o novo id. A remoção e a inserção
+        são aplicadas juntas: nenhuma busca vê o documento ausente ou
+        duplicado, e `version` avança uma única vez.
+        """
+        index = BM25Index([document], k1=self.k1, b=self.b)
+        with self._lock:
+            if doc_id not in self._where:
+                raise KeyError(f"Documento {doc_id} não está no índice.")
+            self._tombstone([doc_id])
+            new_id = self._append_segment(index)[0]
+            self.version = next(_VERSIONS)
+        self._signal()
+        return new_id
+
+    def _append_segment(self, index: BM25Index) -> List[int]:
+        """Registra um segmento novo (chamar com o lock)."""
+        ids = tuple(range(self._next_id, self._next_id + len(index)))
+        self._next_id += len(index)
+        segment = Segment(self._next_uid, index, ids)
+        self._next_uid += 1
+        for local, doc_id in enumerate(ids):
+            self._where[doc_id] = (segment.uid, local)
+        self._segments = self._segments + (segment,)
+        return list(ids)
+
+    def _tombstone(self, doc_ids: Iterable[int]) -> int:
+        """Aplica tombstones e troca os segmentos afetados (chamar com o lock)."""
+        by_uid: Dict[int, List[int]] = {}
+        for doc_id in doc_ids:
+            location = self._where.pop(doc_id, None)
+            if location is not None:
+                by_uid.setdefault(location[0], []).append(location[1])
+        if by_uid:
+            self._segments = tuple(
+                self._with_deleted(seg, by_uid[seg.uid]) if seg.uid in by_uid else seg
+                for seg in self._segments
+            )
+        return sum(len(locals_) for locals_ in by_uid.values())
+
+    @staticmethod
+    def _with_deleted(segment: Segment, locals_: Iterable[int]) -> Segment:
+        new = set(locals_) - segment.deleted
+        return replace(
+            segment,
+            deleted=segment.deleted | new,
+            deleted_len=segment.deleted_len + sum(segment.index.doc_len[d] for d in new),
+        )
+
+    def document(self, doc_id: int) -> str:
+        """Texto de um documento vivo."""
+        uid, local = self._where[doc_id]
+        for seg in self._segments:
+            if seg.uid == uid:
+                return seg.index.docs[local]
+        raise KeyError(doc_id)
+
+    # --------------------------------------------------------------------
+    # 🔍 Busca
+    # --------------------------------------------------------------------
+
+    def _search_snapshot(self, query: str, k: int) -> List[Tuple[float, int, Segment, int]]:
+        segments = self._segments
+        live = sum(seg.live for seg in segments)
+        if k <= 0 or not live:
+            return []
+        avgdl = sum(seg.live_len for seg in segments) / live
+        terms = Counter(tokenize(query))
+        df_cache: Dict[str, int] = {}
+
+        def df(term: str) -> int:
+            if term not in df_cache:
+                df_cache[term] = sum(seg.df(term) for seg in segments)
+            return df_cache[term]
+
+        hits = []
+        for seg in segments:
+            if not seg.live:
+                continue
+            for local, score in seg.index._search(terms, k, live, avgdl, df, exclude=seg.deleted):
+                hits.append((score, seg.ids[local], seg, local))
+        return heapq.nlargest(k, hits, key=lambda h: (h[0], -h[1]))
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Top-k BM25 sobre um snapshot consistente de todos os segmentos.
+
+        Returns:
+            List[Tuple[int, float]]: (id global, score) em ordem decrescente.
+        """
+        return [(doc_id, score) for score, doc_id, _, _ in self._search_snapshot(query, k)]
+
+    def search_documents(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Como search(), mas retorna os textos lidos do mesmo snapshot."""
+        return [(seg.index.docs[local], score) for score, _, seg, local in self._search_snapshot(query, k)]
+
+    # --------------------------------------------------------------------
+    # 🗜️ Merge
+    # --------------------------------------------------------------------
+
+    def _pick(self, segments: Tuple[Segment, ...]) -> List[Segment]:
+        """Política de merge: camadas por tamanho + reescrita de segmentos com muitos tombstones."""
+        if len(segments) > self.max_segments:
+            return sorted(segments, key=lambda s: (s.live, s.uid))[:self.merge_factor]
+        for seg in segments:
+            if seg.deleted and len(seg.deleted) >= self.max_deleted_ratio * len(seg.ids):
+                return [seg]
+        return []
+
+    def merge(self, force: bool = False) -> int:
+        """
+        Executa merges até a política ficar satisfeita (force=True funde
+        todos os segmentos num único, sem tombstones). Retorna quantos
+        merges foram feitos.
+        """
+        merges = 0
+        with self._merge_lock:
+            while True:
+                segments = self._segments
+                if force:
+                    picked = list(segments) if len(segments) > 1 or any(s.deleted for s in segments) else []
+                    force = False
+                else:
+                    picked = self._pick(segments)
+                if not picked:
+                    return merges
+                self._merge(picked)
+                merges += 1
+
+    def _merge(self, picked: List[Segment]) -> None:
+        # Fase 1 (sem lock): reindexa os documentos vivos em ordem de id global
+        live = sorted(
+            (seg.ids[local], seg.index.docs[local])
+            for seg in picked
+            for local in range(len(seg.ids))
+            if local not in seg.deleted
+        )
+        index = BM25Index([doc for _, doc in live], k1=self.k1, b=self.b)
+        ids = tuple(doc_id for doc_id, _ in live)
+        new_local = {doc_id: local for local, doc_id in enumerate(ids)}
+
+        # Fase 2 (com lock): aplica remoções ocorridas durante o merge e troca os segmentos
+        with self._lock:
+            current = {seg.uid: seg for seg in self._segments}
+            late = [
+                new_local[seg.ids[local]]
+                for old in picked
+                for seg in (current[old.uid],)
+                for local in seg.deleted - old.deleted
+            ]
+            merged = self._with_deleted(Segment(self._next_uid, index, ids), late)
+            self._next_uid += 1
+            for local, doc_id in enumerate(ids):
+                if local not in merged.deleted:
+                    self._where[doc_id] = (merged.uid, local)
+
+            uids = {seg.uid for seg in picked}
+            kept = [seg for seg in self._segments if seg.uid not in uids]
+            if merged.live:
+                kept.append(merged)
+            self._segments = tuple(kept)
+
+    def _signal(self) -> None:
+        if self._thread is not None:
+            self._wakeup.notify()
+
+    def close(self) -> None:
+        """Encerra a thread de merge em segundo plano."""
+        if self._thread is not None:
+            self._wakeup.notify(close=True)
+            if self._thread is not threading.current_thread():
+                self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "SegmentedIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ------------------------------------------------------------------------
+# 🧪 Teste Local
+# ------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    with SegmentedIndex(max_segments=2) as index:
+        first = index.add_documents([
+            "A densidade semântica é a métrica que mede coerência interna de um texto.",
+            "Pressão contextual é o grau de saturação cognitiva entre lógica e criatividade.",
+        ])
+        second = index.add_documents(["O modo minimalista favorece precisão e inferência determinística."])
+        index.update_document(first[0], "Densidade semântica mede a coerência de um texto.")
+        index.merge()
+
+        print("Versão:", index.version, "| segmentos:", len(index.segments), "| documentos:", len(index))
+        for doc, score in index.search_documents("densidade semântica", k=2):
+            print(f"{score:.3f}  {doc}")
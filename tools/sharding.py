@@ -0,0 +1,233 @@
+"""
+tools/sharding.py
+-----------------
+
+Recuperação BM25 particionada entre processos (scatter-gather) para o CEF.
+
+Objetivo:
+    Quando o corpus não cabe mais num processo, dividi-lo em N shards,
+    cada um num worker local com seu próprio índice invertido, para que
+    a vazão de consultas escale com os núcleos de uma máquina grande.
+
+Funcionamento:
+    - Particionamento por hash estável do id (BLAKE2b, igual entre
+      execuções) ou por faixas contíguas de documentos
+    - Cada shard vive num processo dedicado (ProcessPoolExecutor de um
+      worker, inicializado uma vez com seus documentos)
+    - Estatísticas globais (N, avgdl, df) são agregadas no processo pai
+      na construção e enviadas com cada consulta: os scores são os
+      mesmos de um BM25Index sobre o corpus inteiro
+    - A consulta é enviada a todos os shards; os top-k parciais são
+      fundidos com um heap
+    - `deadline` (segundos): shards que não respondem a tempo são
+      ignorados naquela consulta e listados em `last_missing` (por
+      thread: consultas concorrentes não se sobrescrevem)
+    - Com deadline, cada shard aceita no máximo `max_pending` consultas
+      pendentes; um shard lento acima disso é dado como ausente na hora,
+      em vez de acumular uma fila que atrasaria todas as consultas seguintes
+
+Uso:
+    with ShardedRetriever(corpus, shards=8) as retriever:
+        docs = recuperar_documentos(query, index=retriever, k=5)
+"""
+
+import hashlib
+import heapq
+import multiprocessing as mp
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from core.context_metrics import tokenize
+from tools.bm25 import _VERSIONS, BM25Index
+
+PARTITIONS = ("hash", "range")
+
+# ------------------------------------------------------------------------
+# 👷 Lado do Worker
+# ------------------------------------------------------------------------
+
+_SHARD_INDEX: Optional[BM25Index] = None
+_SHARD_IDS: List[int] = []
+
+
+def _init_shard(ids: List[int], docs: List[str], k1: float, b: float) -> None:
+    """Constrói o índice do shard uma única vez no processo worker."""
+    global _SHARD_INDEX, _SHARD_IDS
+    _SHARD_INDEX = BM25Index(docs, k1=k1, b=b)
+    _SHARD_IDS = ids
+
+
+def _shard_stats() -> Tuple[int, int, Dict[str, int]]:
+    """(documentos, tokens, df por termo) do shard."""
+    return (len(_SHARD_INDEX), _SHARD_INDEX.total_len,
+            {term: len(postings) for term, postings in _SHARD_INDEX.postings.items()})
+
+
+def _search_shard(terms: Counter, k: int, n_docs: int, avgdl: float,
+                  df: Dict[str, int]) -> List[Tuple[float, int, str]]:
+    """Top-k local com estatísticas globais: [(score, id global, documento)]."""
+    hits = _SHARD_INDEX._search(terms, k, n_docs, avgdl, lambda term: df.get(term, 0))
+    return [(score, _SHARD_IDS[local], _SHARD_INDEX.docs[local]) for local, score in hits]
+
+
+# ------------------------------------------------------------------------
+# 🔀 Particionamento
+# ------------------------------------------------------------------------
+
+def shard_of(doc_id: int, shards: int) -> int:
+    """Shard de um documento por hash estável (não usa hash() do Python)."""
+    digest = hashlib.blake2b(str(doc_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % shards
+
+
+def partition(n_docs: int, shards: int, strategy: str = "hash") -> List[List[int]]:
+    """Ids globais de cada shard (em ordem crescente)."""
+    if strategy not in PARTITIONS:
+        raise ValueError(f"Particionamento desconhecido: {strategy}")
+    if strategy == "range":
+        size = -(-n_docs // shards) if n_docs else 0
+        return [list(range(i * size, min((i + 1) * size, n_docs))) for i in range(shards)]
+    parts: List[List[int]] = [[] for _ in range(shards)]
+    for doc_id in range(n_docs):
+        parts[shard_of(doc_id, shards)].append(doc_id)
+    return parts
+
+
+# ------------------------------------------------------------------------
+# 🌐 Recuperador Particionado
+# ------------------------------------------------------------------------
+
+class ShardedRetriever:
+    """
+    BM25 distribuído entre processos locais com fusão por heap.
+
+    Args:
+        documents (Sequence[str]): Corpus (ids globais = posição).
+        shards (int): Número de shards / processos.
+        strategy (str): "hash" ou "range".
+        k1 (float), b (float): Parâmetros do BM25.
+        deadline (float): Tempo máximo de espera por consulta em
+            segundos (None = espera todos os shards).
+        max_pending (int): Consultas pendentes por shard antes de ele
+            ser ignorado (só com deadline).
+        start_method (str): Método de início dos processos.
+    """
+
+    def __init__(self, documents: Sequence[str], shards: int = 4, strategy: str = "hash",
+                 k1: float = 1.5, b: float = 0.75, deadline: Optional[float] = None,
+                 max_pending: int = 2, start_method: str = "spawn"):
+        documents = list(documents)
+        self.shards = max(1, shards)
+        self.strategy = strategy
+        self.deadline = deadline
+        self.max_pending = max(1, max_pending)
+        self._local = threading.local()
+        self._pending_lock = threading.Lock()
+        self.version = next(_VERSIONS)  # o corpus dos shards é imutável
+
+        context = mp.get_context(start_method)
+        self._parts = partition(len(documents), self.shards, strategy)
+        self._executors = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_init_shard,
+                                initargs=(ids, [documents[i] for i in ids], k1, b))
+            for ids in self._parts
+        ]
+        self._pending: List[Set] = [set() for _ in self._executors]
+
+        self.n_docs = 0
+        self.total_len = 0
+        self.df: Counter = Counter()
+        for n, total_len, df in (ex.submit(_shard_stats).result() for ex in self._executors):
+            self.n_docs += n
+            self.total_len += total_len
+            self.df.update(df)
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    @property
+    def avgdl(self) -> float:
+        return self.total_len / self.n_docs if self.n_docs else 0.0
+
+    @property
+    def last_missing(self) -> List[int]:
+        """Shards ausentes na última consulta desta thread."""
+        return getattr(self._local, "missing", [])
+
+    # --------------------------------------------------------------------
+    # 🔍 Busca
+    # --------------------------------------------------------------------
+
+    def _gather(self, query: str, k: int) -> List[Tuple[float, int, str]]:
+        if k <= 0 or not self.n_docs:
+            self._local.missing = []
+            return []
+        terms = Counter(tokenize(query))
+        df = {term: self.df[term] for term in terms if term in self.df}
+        futures = {}
+        skipped = []
+        for shard, ex in enumerate(self._executors):
+            pending = self._pending[shard]
+            with self._pending_lock:
+                if self.deadline is not None and len(pending) >= self.max_pending:
+                    skipped.append(shard)
+                    continue
+                future = ex.submit(_search_shard, terms, k, self.n_docs, self.avgdl, df)
+                pending.add(future)
+            future.add_done_callback(lambda f, pending=pending: self._settle(pending, f))
+            futures[future] = shard
+        done, not_done = wait(futures, timeout=self.deadline)
+        for future in not_done:
+            future.cancel()  # só tem efeito se ainda estiver na fila
+        self._local.missing = sorted(skipped + [futures[f] for f in not_done])
+        hits = [hit for future in done for hit in future.result()]
+        return heapq.nlargest(k, hits, key=lambda h: (h[0], -h[1]))
+
+    def _settle(self, pending: Set, future) -> None:
+        with self._pending_lock:
+            pending.discard(future)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Top-k global fundido dos shards que responderam no prazo.
+
+        Returns:
+            List[Tuple[int, float]]: (id global, score) em ordem decrescente.
+        """
+        return [(doc_id, score) for score, doc_id, _ in self._gather(query, k)]
+
+    def search_documents(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Como search(), mas retorna os textos (enviados pelos shards)."""
+        return [(doc, score) for score, _, doc in self._gather(query, k)]
+
+    def close(self) -> None:
+        """Encerra os processos dos shards."""
+        for ex in self._executors:
+            ex.shutdown(wait=True, cancel_futures=True)
+        self._executors = []
+
+    def __enter__(self) -> "ShardedRetriever":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# ------------------------------------------------------------------------
+# 🧪 Teste Local
+# ------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    import random
+
+    random.seed(0)
+    vocab = [f"termo{i}" for i in range(500)]
+    corpus = [" ".join(random.choices(vocab, k=40)) for _ in range(20_000)]
+    reference = BM25Index(corpus)
+
+    with ShardedRetriever(corpus, shards=4) as retriever:
+        query = "termo1 termo2 termo3"
+        same = [d for d, _ in retriever.search(query, 5)] == [d for d, _ in reference.search(query, 5)]
+        print("Top-5 idêntico ao índice único:", same, "| shards ausentes:", retriever.last_missing)
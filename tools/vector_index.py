@@ -0,0 +1,250 @@
+"""
+tools/vector_index.py
+---------------------
+
+Índice vetorial denso em NumPy para o RAG do CEF.
+
+Objetivo:
+    Fornecer busca vetorial embutida (sem FAISS/Pinecone) ao lado de
+    `recuperar_documentos`, devolvendo candidatos que `rerank_semantico`
+    consome diretamente.
+
+Modos:
+    flat – busca exata (produto interno sobre vetores normalizados)
+    ivf  – aproximada: k-means particiona os vetores em `n_lists`
+           listas; a consulta visita apenas as `n_probe` mais próximas
+
+Persistência:
+    save(dir) grava vectors.npy, (ivf) centroids.npy / list_offsets.npy /
+    list_ids.npy, docs.jsonl, doc_offsets.npy e meta.json. load(dir) abre
+    os arrays com mmap_mode="r" e os textos como um mmap de docs.jsonl
+    lido sob demanda pelos offsets: um worker abre um índice de vários
+    GB instantaneamente e o sistema operacional pagina apenas as listas
+    e os documentos tocados.
+
+Requisitos:
+    pip install numpy
+"""
+
+import json
+import mmap as _mmap
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from tools.embedders import Embedder
+
+# ------------------------------------------------------------------------
+# ⚙️ Utilitários
+# ------------------------------------------------------------------------
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _kmeans(vectors: np.ndarray, n_lists: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """K-means esférico (centróides normalizados) em lotes."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        empty = np.bincount(assign, minlength=n_lists) == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray, block: int = 65_536) -> np.ndarray:
+    out = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), block):
+        out[start:start + block] = np.argmax(vectors[start:start + block] @ centroids.T, axis=1)
+    return out
+
+
+def _top_k(scores: np.ndarray, ids: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    k = min(k, len(scores))
+    if k == 0:
+        return []
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.lexsort((ids[top], -scores[top]))]
+    return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+class _LazyDocs(Sequence):
+    """Textos de docs.jsonl lidos sob demanda (offsets em bytes por documento)."""
+
+    def __init__(self, path: str, offsets: np.ndarray):
+        self._offsets = offsets
+        with open(path, "rb") as f:
+            self._data = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ) if offsets[-1] else b""
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return json.loads(self._data[int(self._offsets[i]):int(self._offsets[i + 1])].decode("utf-8"))
+
+
+# ------------------------------------------------------------------------
+# 🧭 Índice Denso
+# ------------------------------------------------------------------------
+
+class DenseIndex:
+    """
+    Índice vetorial por similaridade de cosseno.
+
+    Args:
+        vectors (np.ndarray): Embeddings (n, d) dos documentos.
+        docs (Sequence[str]): Textos correspondentes (ids = posição).
+        mode (str): "flat" (exato) ou "ivf" (aproximado).
+        n_lists (int): Partições do IVF (padrão: ≈ √n).
+        n_probe (int): Partições visitadas por consulta no IVF.
+        dtype (str): Armazenamento dos vetores ("float32" ou "float16").
+    """
+
+    def __init__(self, vectors: np.ndarray, docs: Sequence[str], mode: str = "flat",
+                 n_lists: Optional[int] = None, n_probe: int = 8, block_size: int = 65_536, dtype: str = "float32"):
+        if mode not in ("flat", "ivf"):
+            raise ValueError(f"Modo de índice desconhecido: {mode}")
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"dtype de índice desconhecido: {dtype}")
+        self.docs = list(docs)
+        self.mode = mode
+        self.n_probe = n_probe
+        self.block_size = block_size
+        self.vectors = _normalize(vectors) if len(self.docs) else np.zeros((0, 0), dtype=np.float32)
+        self.centroids: Optional[np.ndarray] = None
+        self.list_offsets: Optional[np.ndarray] = None
+        self.list_ids: Optional[np.ndarray] = None
+
+        if mode == "ivf" and len(self.docs):
+            n_lists = min(n_lists or max(1, int(np.sqrt(len(self.docs)))), len(self.docs))
+            self.centroids = _kmeans(self.vectors, n_lists)
+            assign = _nearest(self.vectors, self.centroids)
+            self.list_ids = np.argsort(assign, kind="stable").astype(np.int64)
+            self.list_offsets = np.concatenate(([0], np.cumsum(np.bincount(assign, minlength=n_lists))))
+        self.vectors = self.vectors.astype(dtype, copy=False)
+
+    @classmethod
+    def from_texts(cls, docs: Sequence[str], embedder: Embedder, **options) -> "DenseIndex":
+        """Embedda os documentos e constrói o índice."""
+        return cls(embedder.encode(list(docs)), docs, **options)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # --------------------------------------------------------------------
+    # 🔍 Busca
+    # --------------------------------------------------------------------
+
+    def search(self, query_vector: np.ndarray, k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Retorna os k documentos mais similares ao vetor de consulta.
+
+        Returns:
+            List[Tuple[int, float]]: (doc_id, cosseno) em ordem decrescente.
+        """
+        if not self.docs:
+            return []
+        query = _normalize(query_vector)[0]
+
+        if self.mode == "flat":
+            scores = np.empty(len(self.docs), dtype=np.float32)
+            for start in range(0, len(self.docs), self.block_size):
+                block = np.asarray(self.vectors[start:start + self.block_size], dtype=np.float32)
+                scores[start:start + self.block_size] = block @ query
+            return _top_k(scores, np.arange(len(self.docs)), k)
+
+        probe = min(self.n_probe, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ query), probe - 1)[:probe]
+        ids = np.sort(np.concatenate([self.list_ids[self.list_offsets[c]:self.list_offsets[c + 1]]
+                                      for c in lists]))
+        scores = np.asarray(self.vectors[ids], dtype=np.float32) @ query
+        return _top_k(scores, ids, k)
+
+    def search_text(self, query: str, embedder: Embedder, k: int = 10) -> List[Tuple[int, float]]:
+        """Embedda a consulta e busca."""
+        return self.search(embedder.encode([query])[0], k)
+
+    # --------------------------------------------------------------------
+    # 💾 Persistência
+    # --------------------------------------------------------------------
+
+    def save(self, path: str) -> None:
+        """Grava o índice em `path` (arrays .npy mapeáveis em memória)."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vectors.npy"), self.vectors)
+        if self.mode == "ivf" and self.centroids is not None:
+            np.save(os.path.join(path, "centroids.npy"), self.centroids)
+            np.save(os.path.join(path, "list_offsets.npy"), self.list_offsets)
+            np.save(os.path.join(path, "list_ids.npy"), self.list_ids)
+        offsets = np.zeros(len(self.docs) + 1, dtype=np.int64)
+        with open(os.path.join(path, "docs.jsonl"), "wb") as f:
+            for i, doc in enumerate(self.docs):
+                line = (json.dumps(doc, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                offsets[i + 1] = offsets[i] + len(line)
+        np.save(os.path.join(path, "doc_offsets.npy"), offsets)
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"mode": self.mode, "n_probe": self.n_probe, "size": len(self.docs)}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "DenseIndex":
+        """
+        Abre um índice salvo. Com mmap=True nem os arrays nem os textos são
+        lidos para a RAM (os textos são decodificados por id, sob demanda).
+        """
+        mmap_mode = "r" if mmap else None
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        docs_file = os.path.join(path, "docs.jsonl")
+        offsets_file = os.path.join(path, "doc_offsets.npy")
+        if mmap and os.path.exists(offsets_file):
+            docs = _LazyDocs(docs_file, np.load(offsets_file, mmap_mode="r"))
+        else:
+            with open(docs_file, encoding="utf-8") as f:
+                docs = [json.loads(line) for line in f]
+
+        index = cls.__new__(cls)
+        index.docs = docs
+        index.mode = meta["mode"]
+        index.n_probe = meta["n_probe"]
+        index.block_size = 65_536
+        index.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode=mmap_mode)
+        index.centroids = index.list_offsets = index.list_ids = None
+        if index.mode == "ivf" and os.path.exists(os.path.join(path, "centroids.npy")):
+            index.centroids = np.load(os.path.join(path, "centroids.npy"))
+            index.list_offsets = np.load(os.path.join(path, "list_offsets.npy"))
+            index.list_ids = np.load(os.path.join(path, "list_ids.npy"), mmap_mode=mmap_mode)
+        return index
+
+
+# ------------------------------------------------------------------------
+# 🧪 Teste Local
+# ------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(200, 64)).astype(np.float32)
+    base = centers[rng.integers(0, 200, 20_000)] + 0.5 * rng.normal(size=(20_000, 64)).astype(np.float32)
+    docs = [f"doc {i}" for i in range(len(base))]
+    queries = base[:100] + 0.3 * rng.normal(size=(100, 64)).astype(np.float32)
+
+    flat = DenseIndex(base, docs)
+    ivf = DenseIndex(base, docs, mode="ivf", n_probe=16)
+    recall = np.mean([
+        len({i for i, _ in flat.search(q, 10)} & {i for i, _ in ivf.search(q, 10)}) / 10
+        for q in queries
+    ])
+    print(f"IVF recall@10 vs flat: {recall:.3f}")